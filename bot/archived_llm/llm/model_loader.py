@@ -8,6 +8,8 @@ logger = logging.getLogger(__name__)
 def load_model(model_path: str) -> Llama:
     """Load llama.cpp model with optimized settings for Qwen 2.5 Coder"""
     try:
+        # Autodetect threads / GPU offload unless MODEL_N_THREADS / MODEL_N_GPU_LAYERS are set
+        Config.detect_model_resources()
         logger.info(f"Loading model from {model_path}")
         logger.info(f"Config: n_ctx={Config.MODEL_N_CTX}, n_threads={Config.MODEL_N_THREADS}, n_gpu_layers={Config.MODEL_N_GPU_LAYERS}")
         
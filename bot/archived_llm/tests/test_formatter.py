@@ -1,9 +1,6 @@
 """
 Test script for new Jinja2-based response formatter
 """
-import sys
-sys.path.insert(0, '/app')
-
 from llm.response_formatter_new import ResponseFormatter
 from datetime import datetime, timezone
 
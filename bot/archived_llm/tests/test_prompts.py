@@ -9,22 +9,22 @@ Validates:
 """
 
 import pytest
-from pathlib import Path
-import sys
-
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from llm.prompt_builder import PromptBuilder, get_prompt_builder
 from config import Config
 
 
+@pytest.fixture(scope='session')
+def builder():
+    """Shared PromptBuilder - templates are loaded once for the whole run"""
+    return get_prompt_builder()
+
+
 class TestPromptTemplates:
     """Test prompt template loading and rendering"""
     
-    def test_load_templates(self):
+    def test_load_templates(self, builder):
         """Test that templates load successfully"""
-        builder = get_prompt_builder()
         templates = builder.get_available_templates()
         
         assert len(templates) > 0, "No templates loaded"
@@ -32,10 +32,8 @@ class TestPromptTemplates:
         assert 'error_recovery_v1' in templates
         assert 'clarification_v1' in templates
     
-    def test_query_generation_prompt(self):
+    def test_query_generation_prompt(self, builder):
         """Test basic query generation prompt"""
-        builder = get_prompt_builder()
-        
         prompt, params = builder.build_query_generation_prompt(
             user_message="Show me my skills",
             schema_text="type Query { skills: [Skill!]! }",
@@ -56,10 +54,8 @@ class TestPromptTemplates:
         assert 'temperature' in params
         assert 'stop' in params
     
-    def test_error_recovery_prompt(self):
+    def test_error_recovery_prompt(self, builder):
         """Test error recovery prompt with validation error"""
-        builder = get_prompt_builder()
-        
         prompt, params = builder.build_query_generation_prompt(
             user_message="Show schedule",
             schema_text="type Query { events: [Event!]! }",
@@ -76,10 +72,8 @@ class TestPromptTemplates:
         # Temperature should be slightly higher for retry
         assert params['temperature'] >= 0.2
     
-    def test_format_examples(self):
+    def test_format_examples(self, builder):
         """Test example formatting"""
-        builder = get_prompt_builder()
-        
         examples = [
             {'intent': 'List all skills', 'query': 'query { skills { id name } }'},
             {'intent': 'Start session', 'query': 'mutation { startSession(...) }'}
@@ -92,10 +86,8 @@ class TestPromptTemplates:
         assert "List all skills" in formatted
         assert "Start session" in formatted
     
-    def test_format_schema(self):
+    def test_format_schema(self, builder):
         """Test schema formatting"""
-        builder = get_prompt_builder()
-        
         schema_parts = [
             {'text': 'type Query { skills: [Skill!]! }'},
             {'text': 'type Mutation { createSkill: Skill! }'}
@@ -111,10 +103,8 @@ class TestPromptTemplates:
 class TestPromptGeneration:
     """Test end-to-end prompt generation"""
     
-    def test_prompt_length(self):
+    def test_prompt_length(self, builder):
         """Ensure prompts are reasonable length"""
-        builder = get_prompt_builder()
-        
         # Simulate RAG context
         schema = "type Query { skills: [Skill!]! }\ntype Skill { id: UUID! name: String! }"
         examples = "# Example\nquery { skills { id name } }"
@@ -129,10 +119,8 @@ class TestPromptGeneration:
         assert len(prompt) > 100, "Prompt too short"
         assert len(prompt) < 8000, "Prompt too long (may exceed context)"
     
-    def test_token_counts(self):
+    def test_token_counts(self, builder):
         """Test that max_tokens parameters are set correctly"""
-        builder = get_prompt_builder()
-        
         prompt, params = builder.build_query_generation_prompt(
             user_message="Test",
             schema_text="schema",
@@ -147,10 +135,8 @@ class TestPromptGeneration:
 class TestErrorGuidance:
     """Test error-specific guidance generation"""
     
-    def test_startSession_guidance(self):
+    def test_startSession_guidance(self, builder):
         """Test guidance for startSession mutation errors"""
-        builder = get_prompt_builder()
-        
         error = "Unknown argument 'startedAt' on field 'startSession'"
         failed_query = "mutation { startSession(skillId: \"...\", startedAt: \"...\") }"
         
@@ -159,10 +145,8 @@ class TestErrorGuidance:
         assert "startSession" in guidance
         assert "skillId" in guidance or "name" in guidance
     
-    def test_cannot_query_field_guidance(self):
+    def test_cannot_query_field_guidance(self, builder):
         """Test guidance for 'Cannot query field' errors"""
-        builder = get_prompt_builder()
-        
         error = 'Cannot query field "schedule" on type "Query"'
         failed_query = "query { schedule { id } }"
         
@@ -171,11 +155,9 @@ class TestErrorGuidance:
         assert "schedule" in guidance or "field" in guidance.lower()
 
 
-def test_integration_with_config():
+def test_integration_with_config(builder):
     """Test that PromptBuilder integrates with Config"""
     # Should use Config.SCHEMAS_DIR / 'prompts'
-    builder = get_prompt_builder()
-    
     assert builder.templates_dir.exists()
     assert len(builder.templates) > 0
 
@@ -4,15 +4,62 @@ Simplified GraphQL Client for RAG-based Query Execution
 Executes raw GraphQL queries and handles entity resolution
 """
 
+import asyncio
 import logging
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 from difflib import get_close_matches
+from itertools import islice
+import aiohttp
 from gql import gql, Client
 from gql.transport.aiohttp import AIOHTTPTransport
+from graphql import DocumentNode
 
 logger = logging.getLogger(__name__)
 
+# Skill-name patterns, compiled once and tried in priority order (the generic
+# "<name> coding session" form must not win over the more specific ones)
+_EXTRACT_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    # "start a Python session"
+    r'(?:start|begin|practice)\s+(?:a\s+)?([A-Za-z0-9\s]+?)\s+(?:session|practice|coding)',
+    # "start session for Python"
+    r'session\s+(?:for|with)\s+([A-Za-z0-9\s]+)',
+    # "practicing Guitar"
+    r'(?:practicing|learning|studying)\s+([A-Za-z0-9\s]+)',
+    # "Python coding session"
+    r'([A-Za-z0-9\s]+?)\s+(?:coding|practice|study|learning)\s+session',
+))
+_EXTRACT_STOPWORDS = frozenset({'a', 'the', 'my', 'new', 'session'})
+
+# Fallback skill-name scan: first capitalized word of 3+ chars (likely a skill name).
+# Kept as a single compiled regex - string scanning like this is not a numba/JIT candidate.
+_CAPWORD_RE = re.compile(r'\b([A-Z][A-Za-z0-9]{2,})\b')
+_STOPWORDS = frozenset({'the', 'a', 'my', 'i'})
+
+# One bounded keep-alive pool shared by every user's client (created lazily inside the event loop)
+_shared_connector: Optional[aiohttp.TCPConnector] = None
+
+
+def get_shared_connector() -> aiohttp.TCPConnector:
+    """Get the process-wide connector, creating it on first use"""
+    global _shared_connector
+    if _shared_connector is None or _shared_connector.closed:
+        _shared_connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=100,
+            keepalive_timeout=60,
+            ttl_dns_cache=300
+        )
+    return _shared_connector
+
+
+async def close_shared_connector():
+    """Close the process-wide connector (call once on shutdown, after all clients)"""
+    global _shared_connector
+    if _shared_connector is not None:
+        await _shared_connector.close()
+        _shared_connector = None
+
 
 class GraphQLClient:
     """Simplified GraphQL client for executing raw queries with per-user auth"""
@@ -22,6 +69,10 @@ class GraphQLClient:
         self.auth_token = auth_token
         self.timeout = timeout
         self._client = None
+        self._session = None
+        self._connect_lock = asyncio.Lock()
+        # Caps in-flight requests per client so concurrent queries can't drain the shared pool
+        self._semaphore = asyncio.Semaphore(8)
         self._update_client()
     
     def _update_client(self):
@@ -30,10 +81,13 @@ class GraphQLClient:
         if self.auth_token:
             headers['Authorization'] = f'Bearer {self.auth_token}'
         
+        # The shared connector is attached in _get_session(), since aiohttp
+        # connectors must be created inside the running event loop
         transport = AIOHTTPTransport(
             url=self.url,
             headers=headers,
-            timeout=self.timeout
+            timeout=self.timeout,
+            client_session_args={'connector_owner': False}
         )
         
         self._client = Client(
@@ -41,9 +95,38 @@ class GraphQLClient:
             fetch_schema_from_transport=False,
             execute_timeout=self.timeout
         )
+        self._session = None
     
-    def set_auth_token(self, token: str):
-        """Update authentication token"""
+    async def _get_session(self):
+        """
+        Get the permanent session, connecting on first use
+        
+        One aiohttp session per client keeps the TCP/TLS connection to the
+        backend warm across queries instead of reconnecting on every execute.
+        Sessions draw from the shared connector, which bounds total backend
+        connections across all users.
+        """
+        if self._session is None:
+            async with self._connect_lock:
+                if self._session is None:
+                    self._client.transport.client_session_args['connector'] = get_shared_connector()
+                    self._session = await self._client.connect_async()
+        return self._session
+    
+    async def close(self):
+        """Close the permanent session (the shared connector stays open)"""
+        if self._session is not None:
+            self._session = None
+            http_session = self._client.transport.session
+            await self._client.close_async()
+            # gql skips closing sessions that don't own their connector - close it here;
+            # aiohttp then detaches from the shared connector without closing it
+            if http_session is not None and not http_session.closed:
+                await http_session.close()
+    
+    async def set_auth_token(self, token: str):
+        """Update authentication token, closing any open session (reconnects on next request)"""
+        await self.close()
         self.auth_token = token
         self._update_client()
     
@@ -71,8 +154,8 @@ class GraphQLClient:
             result = await self.execute(query, variables)
             auth_payload = result.get('login')
             if auth_payload and auth_payload.get('token'):
-                # Update client with new token
-                self.set_auth_token(auth_payload['token'])
+                # Update client with new token (reconnects on next request)
+                await self.set_auth_token(auth_payload['token'])
                 return auth_payload
             else:
                 raise ValueError("Login failed: no token received")
@@ -82,18 +165,35 @@ class GraphQLClient:
     
     async def execute(
         self,
-        query: str,
+        query: Union[str, DocumentNode],
         variables: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Execute GraphQL query or mutation"""
+        """Execute GraphQL query or mutation (raw string or pre-parsed gql() document)"""
         try:
-            async with self._client as session:
-                result = await session.execute(gql(query), variable_values=variables)
-                return result
+            document = gql(query) if isinstance(query, str) else query
+            session = await self._get_session()
+            async with self._semaphore:
+                return await session.execute(document, variable_values=variables)
         except Exception as e:
             logger.error(f"GraphQL error: {e}")
             raise
     
+    async def execute_many(
+        self,
+        *requests: tuple,
+        return_exceptions: bool = False
+    ) -> List[Any]:
+        """
+        Execute independent (query, variables) pairs concurrently
+        
+        Results come back in request order. Concurrency is bounded by the
+        client's semaphore, so latency is the slowest query rather than the sum.
+        """
+        return await asyncio.gather(
+            *(self.execute(query, variables) for query, variables in requests),
+            return_exceptions=return_exceptions
+        )
+    
     async def execute_with_resolution(
         self,
         query: str,
@@ -105,17 +205,39 @@ class GraphQLClient:
         
         Handles placeholders like SKILL_ID_PLACEHOLDER by resolving entities
         """
-        import re
+        # Most queries carry no placeholders - skip the regex work entirely
+        if 'PLACEHOLDER' not in query:
+            return await self.execute(query, variables)
         
         # Check if query needs skill resolution (flexible pattern matching)
         # Matches: SKILL_ID_PLACEHOLDER, PYTHON_ID_PLACEHOLDER, MATH_ID_PLACEHOLDER, etc.
+        # ACTIVITY_ID_PLACEHOLDER is resolved from the active session instead.
         skill_placeholder_pattern = r'["\']?(\w+_ID_PLACEHOLDER)["\']?'
-        skill_matches = re.findall(skill_placeholder_pattern, query)
+        skill_matches = [
+            m for m in re.findall(skill_placeholder_pattern, query)
+            if m != 'ACTIVITY_ID_PLACEHOLDER'
+        ]
+        needs_activity = 'ACTIVITY_ID_PLACEHOLDER' in query
         
         if skill_matches:
-            # Resolve skill from message
             logger.info(f"Detected skill placeholders: {skill_matches}. Resolving skill from message...")
-            skill_id = await self._resolve_skill(user_message)
+        
+        # Skill and active-session lookups are independent round trips - run them concurrently.
+        # gather re-raises the first error as-is (e.g. ValueError with skill suggestions)
+        tasks = []
+        if skill_matches:
+            tasks.append(asyncio.create_task(self._resolve_skill(user_message)))
+        if needs_activity:
+            tasks.append(asyncio.create_task(self._resolve_active_session()))
+        try:
+            results = iter(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        if skill_matches:
+            skill_id = next(results)
             if skill_id:
                 # Replace all skill-related placeholders with the resolved ID
                 for placeholder in skill_matches:
@@ -127,9 +249,8 @@ class GraphQLClient:
             else:
                 raise ValueError(f"Could not find or create skill from message: {user_message}")
         
-        # Check if query needs active session ID
-        if 'ACTIVITY_ID_PLACEHOLDER' in query:
-            activity_id = await self._resolve_active_session()
+        if needs_activity:
+            activity_id = next(results)
             if activity_id:
                 query = query.replace('"ACTIVITY_ID_PLACEHOLDER"', f'"{activity_id}"')
                 query = query.replace("'ACTIVITY_ID_PLACEHOLDER'", f'"{activity_id}"')
@@ -169,6 +290,7 @@ class GraphQLClient:
         
         result = await self.execute(skills_query)
         skills = result.get('skills', [])
+        n_skills = len(skills)
         
         if not skills:
             raise ValueError(
@@ -207,9 +329,9 @@ class GraphQLClient:
                 )
         
         # No close matches - list all skills
-        all_skills_list = ', '.join(f'"{s["name"]}"' for s in skills[:10])
-        if len(skills) > 10:
-            all_skills_list += f' (and {len(skills) - 10} more)'
+        all_skills_list = ', '.join(f'"{s["name"]}"' for s in islice(skills, 10))
+        if n_skills > 10:
+            all_skills_list += f' (and {n_skills - 10} more)'
         
         raise ValueError(
             f"I couldn't find a skill matching '{skill_name}'. "
@@ -236,30 +358,19 @@ class GraphQLClient:
         return None
     
     def _extract_skill_name(self, message: str) -> Optional[str]:
-        """Extract skill name from user message using regex patterns"""
-        patterns = [
-            # "start a Python session"
-            r'(?:start|begin|practice)\s+(?:a\s+)?([A-Za-z0-9\s]+?)\s+(?:session|practice|coding)',
-            # "start session for Python"
-            r'session\s+(?:for|with)\s+([A-Za-z0-9\s]+)',
-            # "practicing Guitar"
-            r'(?:practicing|learning|studying)\s+([A-Za-z0-9\s]+)',
-            # "Python coding session"
-            r'([A-Za-z0-9\s]+?)\s+(?:coding|practice|study|learning)\s+session',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, message, re.IGNORECASE)
+        """Extract skill name from user message using precompiled regex patterns"""
+        for pattern in _EXTRACT_PATTERNS:
+            match = pattern.search(message)
             if match:
                 skill_name = match.group(1).strip()
                 # Filter out common words
-                if skill_name.lower() not in ['a', 'the', 'my', 'new', 'session']:
+                if skill_name.lower() not in _EXTRACT_STOPWORDS:
                     return skill_name
         
         # Fallback: look for capitalized words (likely skill names)
-        words = message.split()
-        for word in words:
-            if word[0].isupper() and len(word) > 2 and word.lower() not in ['the', 'a', 'my', 'i']:
+        for match in _CAPWORD_RE.finditer(message):
+            word = match.group(1)
+            if word.lower() not in _STOPWORDS:
                 return word
         
         return None
@@ -1,4 +1,6 @@
 import os
+import shutil
+import subprocess
 from pathlib import Path
 
 
@@ -14,9 +16,12 @@ class Config:
     
     # LLM Model (Qwen 2.5 Coder 7B optimized)
     MODEL_PATH = os.getenv('MODEL_PATH', '/app/models/qwen2.5-coder-7b-instruct-q5_k_m.gguf')
-    MODEL_N_CTX = int(os.getenv('MODEL_N_CTX', '8192'))  # Qwen supports 32K, using 8K for balance
-    MODEL_N_THREADS = int(os.getenv('MODEL_N_THREADS', '8'))
-    MODEL_N_GPU_LAYERS = int(os.getenv('MODEL_N_GPU_LAYERS', '0'))  # GPU offloading if available
+    # Qwen supports 32K. RAG prompts stay under ~2K tokens, so 4K leaves room for the
+    # generated query while halving KV-cache memory (it grows linearly with n_ctx) vs 8K
+    MODEL_N_CTX = int(os.getenv('MODEL_N_CTX', '4096'))
+    # None (unset or empty) means autodetect from the CPU count in detect_model_resources()
+    MODEL_N_THREADS = int(os.getenv('MODEL_N_THREADS') or 0) or None
+    MODEL_N_GPU_LAYERS = int(os.getenv('MODEL_N_GPU_LAYERS', '0'))  # -1 (all layers) if a GPU is detected
     MODEL_TEMPERATURE = float(os.getenv('MODEL_TEMPERATURE', '0.1'))  # Low for structured output
     MODEL_TEMPERATURE_CREATIVE = float(os.getenv('MODEL_TEMPERATURE_CREATIVE', '0.6'))  # For explanations
     MODEL_MAX_TOKENS_QUERY = int(os.getenv('MODEL_MAX_TOKENS_QUERY', '384'))  # GraphQL generation
@@ -33,6 +38,8 @@ class Config:
     # Bot Settings
     MAX_MESSAGE_LENGTH = 4096  # Telegram limit
     DEFAULT_RESPONSE_TIMEOUT = 30  # seconds
+    # Bot API requests go over HTTP/2 (see main.py), so replies multiplex on open TCP/TLS connections
+    TELEGRAM_POOL_TIMEOUT = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '5'))  # seconds to wait for a free connection
     
     # File Storage
     FILE_STORAGE_PATH = os.getenv('FILE_STORAGE_PATH', '/app/data/files')
@@ -42,4 +49,31 @@ class Config:
     def validate(cls):
         """Validate required configuration"""
         if not cls.TELEGRAM_BOT_TOKEN:
-            raise ValueError("TELEGRAM_BOT_TOKEN is required")
+            raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
+    
+    @classmethod
+    def detect_model_resources(cls):
+        """Size the model to the host when not pinned by the environment (call before loading it)"""
+        if cls.MODEL_N_THREADS is None:
+            cls.MODEL_N_THREADS = os.cpu_count() or 8
+        if 'MODEL_N_GPU_LAYERS' not in os.environ and cls._gpu_available():
+            cls.MODEL_N_GPU_LAYERS = -1  # llama.cpp convention: offload every layer
+    
+    @staticmethod
+    def _gpu_available() -> bool:
+        """Detect a CUDA GPU via torch if installed, otherwise via nvidia-smi"""
+        try:
+            import torch
+            return torch.cuda.is_available()
+        except ImportError:
+            pass
+        
+        if not shutil.which('nvidia-smi'):
+            return False
+        try:
+            result = subprocess.run(
+                ['nvidia-smi', '-L'], capture_output=True, text=True, timeout=5
+            )
+        except (OSError, subprocess.SubprocessError):
+            return False
+        return result.returncode == 0 and 'GPU' in result.stdout
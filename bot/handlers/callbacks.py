@@ -2,21 +2,427 @@
 Callback query handlers for inline button interactions
 """
 
+import asyncio
+import calendar
+import html
 import logging
-from datetime import date, timedelta
+import sys
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache, wraps
+from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
+from gql import gql
 from gql.transport.exceptions import TransportQueryError
 
+from backend_client.simple_client import GraphQLClient
+from handlers import file_handlers
+from handlers.constants import TYPE_EMOJI
+from handlers.message_handlers import EventTemplate
+
 logger = logging.getLogger(__name__)
 
 # Conversation states
 SELECTING_SKILL, ENTERING_SESSION_NAME = range(2)
 
+_LEVEL_EMOJI = {
+    'BEGINNER': '🌱',
+    'INTERMEDIATE': '🌿',
+    'ADVANCED': '🌳',
+    'EXPERT': '🏆'
+}
+
+_PRIORITY_EMOJI = {'LOW': '🔵', 'MEDIUM': '🟡', 'HIGH': '🔴'}
+
+# Success messages, also shown when a retried transition finds it was already applied
+_PAUSED_MSG = "⏸️ **Session Paused**\n\nUse /session to resume or stop."
+_RESUMED_MSG = "▶️ **Session Resumed**\n\nTimer is running. Use /session for controls."
+
+# Event templates: template_type -> (title, start offset, end offset, event type)
+_EVENT_TEMPLATES = {
+    'meeting': ("Team Meeting", timedelta(0), timedelta(minutes=30), "MEETING"),
+    'study': ("Study Session", timedelta(0), timedelta(hours=1), "LEARNING"),
+    'reminder': ("Reminder", timedelta(hours=2), timedelta(hours=2, minutes=15), "REMINDER"),
+}
+
+# Static keyboards are built once - they carry no per-user data
+_SCHEDULE_NAV_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("◀️ Yesterday", callback_data="schedule:yesterday"),
+        InlineKeyboardButton("Tomorrow ▶️", callback_data="schedule:tomorrow")
+    ],
+    [
+        InlineKeyboardButton("📆 This Week", callback_data="schedule:week"),
+        InlineKeyboardButton("📅 This Month", callback_data="schedule:month")
+    ],
+    [
+        InlineKeyboardButton("⏺️ Today", callback_data="schedule:today"),
+        InlineKeyboardButton("➕ New Event", callback_data="event:create")
+    ]
+])
+
+_STATS_NAV_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("Today", callback_data="stats:today"),
+        InlineKeyboardButton("Week", callback_data="stats:week"),
+        InlineKeyboardButton("Month", callback_data="stats:month")
+    ]
+])
+
+_EVENT_TEMPLATES_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("⏰ Quick Meeting", callback_data="event:template:meeting")],
+    [InlineKeyboardButton("📚 Study Session", callback_data="event:template:study")],
+    [InlineKeyboardButton("🔔 Reminder", callback_data="event:template:reminder")],
+    [InlineKeyboardButton("« Back", callback_data="schedule:today")]
+])
+
+# GraphQL documents are parsed once at import instead of on every callback
+_SKILLS_Q = gql("""
+query GetSkills {
+    skills {
+        id
+        name
+        level
+    }
+}
+""")
+
+# Single round trip: the mutation returns the skill, so no separate GetSkill query
+_START_SESSION_MUT = gql("""
+mutation StartSession($skillId: UUID!, $name: String!) {
+    startSession(skillId: $skillId, name: $name) {
+        id
+        name
+        status
+        startedAt
+        skill {
+            id
+            name
+        }
+    }
+}
+""")
+
+_PAUSE_SESSION_MUT = gql("""
+mutation PauseSession($id: UUID!) {
+    pauseSession(id: $id) {
+        id
+        status
+    }
+}
+""")
+
+_RESUME_SESSION_MUT = gql("""
+mutation ResumeSession($id: UUID!) {
+    resumeSession(id: $id) {
+        id
+        status
+    }
+}
+""")
+
+_STOP_SESSION_MUT = gql("""
+mutation StopSession($id: UUID!) {
+    stopSession(id: $id) {
+        id
+        status
+        duration
+    }
+}
+""")
+
+_EVENTS_Q = gql("""
+query GetEvents($startDate: Date!, $endDate: Date!) {
+    events(startDate: $startDate, endDate: $endDate) {
+        title
+        startTime
+        type
+        allDay
+    }
+}
+""")
+
+_STATS_Q = gql("""
+query GetStats($startDate: Date!, $endDate: Date!) {
+    activityStats(startDate: $startDate, endDate: $endDate) {
+        totalActivities
+        totalHours
+        skillBreakdown {
+            skillName
+            totalHours
+        }
+    }
+}
+""")
+
+_NOTES_Q = gql("""
+query GetNotes($limit: Int!) {
+    notes(limit: $limit) {
+        nodes {
+            id
+            title
+            content
+            tags
+            createdAt
+        }
+        totalCount
+    }
+}
+""")
+
+_NOTE_Q = gql("""
+query GetNote($id: UUID!) {
+    note(id: $id) {
+        id
+        title
+        content
+        tags
+        createdAt
+        updatedAt
+    }
+}
+""")
+
+_DELETE_NOTE_MUT = gql("""
+mutation DeleteNote($id: UUID!) {
+    deleteNote(id: $id)
+}
+""")
+
+# Event detail opens with the summary fields; the rest is fetched on "Details"
+_EVENT_MIN_Q = gql("""
+query GetEvent($id: UUID!) {
+    event(id: $id) {
+        id
+        title
+        startTime
+        endTime
+        type
+        allDay
+    }
+}
+""")
+
+_EVENT_FULL_Q = gql("""
+query GetEventDetails($id: UUID!) {
+    event(id: $id) {
+        id
+        title
+        description
+        startTime
+        endTime
+        type
+        allDay
+        location
+        attendees
+    }
+}
+""")
+
+_DELETE_EVENT_MUT = gql("""
+mutation DeleteEvent($id: UUID!) {
+    deleteEvent(id: $id)
+}
+""")
+
+_COMPLETE_REMINDER_MUT = gql("""
+mutation CompleteReminder($id: UUID!) {
+    updateReminder(id: $id, input: {completed: true}) {
+        id
+        title
+        completed
+    }
+}
+""")
+
+_ALL_REMINDERS_Q = gql("""
+query GetAllReminders($limit: Int!) {
+    reminders(limit: $limit) {
+        nodes {
+            id
+            title
+            dueTime
+            completed
+            priority
+        }
+    }
+}
+""")
+
+
+# Skill catalog changes rarely - reuse it for this long (seconds) before refetching
+SKILL_CACHE_TTL = 60
+
+
+def get_cached_skills(context: ContextTypes.DEFAULT_TYPE):
+    """Get the user's skills list if fetched within SKILL_CACHE_TTL, else None"""
+    cache = context.user_data.get('skill_cache')
+    if cache and time.monotonic() - cache['t'] < SKILL_CACHE_TTL:
+        return cache['data']
+    return None
+
+
+def cache_skills(context: ContextTypes.DEFAULT_TYPE, skills: list) -> None:
+    """Store a freshly fetched skills list (cleared with user_data on /logout)"""
+    context.user_data['skill_cache'] = {'t': time.monotonic(), 'data': skills}
+
+
+def _gql_error_message(e: TransportQueryError) -> str:
+    """First GraphQL error message of a failed query"""
+    error_data = e.errors[0] if e.errors else {}
+    return error_data.get('message', str(e))
+
+
+def gql_action(
+    action: str,
+    known_errors: dict,
+    default_msg: str,
+    error_len: int = 150,
+    retry: bool = False,
+    already_done: Optional[tuple] = None
+):
+    """
+    Decorator for session-control callbacks: maps backend failures to user messages
+    
+    With retry, a timeout is retried once after a short backoff before it is reported.
+    
+    Args:
+        action: Verb phrase for logs, e.g. "pausing session"
+        known_errors: {lowercase substring of the GraphQL error: message to show}
+        default_msg: Message for unexpected (non-GraphQL) errors
+        error_len: Max characters of an unrecognized GraphQL error to show
+        retry: Retry a timeout once - only for state transitions, since a timed-out
+            write may already have been committed
+        already_done: (lowercase substring of the GraphQL error, message to show) for
+            the retry finding the session already in the target state, i.e. the
+            timed-out attempt was committed - reported as success, not as an error
+    """
+    attempts = 2 if retry else 1
+    
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
+            query = update.callback_query
+            try:
+                # Optional single retry on timeout; GraphQL errors are semantic and never retried
+                for attempt in range(attempts):
+                    try:
+                        return await func(update, context, *args, **kwargs)
+                    except TimeoutError:
+                        if attempt + 1 < attempts:
+                            logger.warning("Timeout %s, retrying once", action)
+                            await asyncio.sleep(0.2)
+                            continue
+                        raise
+                    except TransportQueryError as e:
+                        if attempt and already_done and already_done[0] in _gql_error_message(e).lower():
+                            logger.info("Timed-out attempt %s was committed", action)
+                            await query.edit_message_text(already_done[1], parse_mode='Markdown')
+                            return
+                        raise
+            except TimeoutError:
+                logger.error("Timeout %s", action)
+                await query.edit_message_text(
+                    "⏱️ **Request Timed Out**\n\n"
+                    "Backend is taking too long. Try again shortly.",
+                    parse_mode='Markdown'
+                )
+            except TransportQueryError as e:
+                error_msg = _gql_error_message(e)
+                logger.error("GraphQL error %s: %s", action, error_msg)
+                
+                lowered = error_msg.lower()
+                for needle, message in known_errors.items():
+                    if needle in lowered:
+                        await query.edit_message_text(message, parse_mode='Markdown')
+                        break
+                else:
+                    await query.edit_message_text(f"❌ Error: {error_msg[:error_len]}")
+            except Exception as e:
+                logger.error("Error %s: %s", action, e, exc_info=True)
+                await query.edit_message_text(default_msg)
+        return wrapper
+    return decorator
+
+
+# Telegram rejects messages over 4096 chars (Config.MAX_MESSAGE_LENGTH). User fields are
+# clipped before formatting, so every view stays under the limit and markup is never cut
+_MAX_TITLE_CHARS = 100
+_MAX_TEXT_CHARS = 1000
+
+
+def _clip(text: str, limit: int = _MAX_TITLE_CHARS) -> str:
+    """Shorten a user-supplied field before it is placed into a message"""
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def _clip_html(text: str, limit: int = _MAX_TITLE_CHARS) -> str:
+    """HTML-escape a user field and shorten it without splitting an &entity;"""
+    escaped = html.escape(text)
+    if len(escaped) <= limit:
+        return escaped
+    cut = escaped[:limit]
+    amp = cut.rfind('&')
+    if amp > cut.rfind(';'):
+        cut = cut[:amp]
+    return cut + "…"
+
+
+if sys.version_info >= (3, 11):
+    # fromisoformat accepts a trailing 'Z' natively since 3.11 (cached - month views repeat timestamps)
+    _parse_iso = lru_cache(maxsize=1024)(datetime.fromisoformat)
+else:
+    @lru_cache(maxsize=1024)
+    def _parse_iso(s: str) -> datetime:
+        """Parse an ISO timestamp from the API (cached - month views repeat them)"""
+        return datetime.fromisoformat(s[:-1] + '+00:00' if s.endswith('Z') else s)
+
 
-def get_user_client(context: ContextTypes.DEFAULT_TYPE):
-    """Get authenticated GraphQL client for the user"""
-    return context.user_data.get('gql_client')
+_WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_MONTHS = ('January', 'February', 'March', 'April', 'May', 'June', 'July',
+           'August', 'September', 'October', 'November', 'December')
+
+
+# hour -> (12-hour clock string, AM/PM)
+_HOUR12 = [(str((h - 1) % 12 + 1), 'AM' if h < 12 else 'PM') for h in range(24)]
+
+
+def _fmt_12h(dt: datetime) -> str:
+    """Format a time as '9:05 AM' without going through strftime"""
+    h12, ampm = _HOUR12[dt.hour]
+    return f"{h12}:{dt.minute:02d} {ampm}"
+
+
+def _fmt_date(dt: datetime) -> str:
+    """Format a date as 'Monday, January 05, 2026' without going through strftime"""
+    return f"{_WEEKDAYS[dt.weekday()]}, {_MONTHS[dt.month - 1]} {dt.day:02d}, {dt.year}"
+
+
+def get_user_client(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Get authenticated GraphQL client for the user
+    
+    The client holds one permanent keep-alive session (opened on first
+    execute, closed on /logout), so callbacks reuse the same connection.
+    If the user has a token but no client yet, one is built from the base
+    client's settings on first use, kept in user_data and registered in
+    active_users like a fresh login - so it gets notifications and is
+    closed on shutdown.
+    """
+    user_data = context.user_data
+    gql_client = user_data.get('gql_client')
+    if gql_client is None and user_data.get('auth_token'):
+        base_client = context.bot_data.get('gql_client')
+        if base_client:
+            gql_client = GraphQLClient(base_client.url, user_data['auth_token'], base_client.timeout)
+            user_data['gql_client'] = gql_client
+            context.bot_data.setdefault('active_users', {})[update.effective_user.id] = {
+                'gql_client': gql_client,
+                'user_id': user_data.get('user_id'),
+                'name': user_data.get('user_name', 'User')
+            }
+    return gql_client
 
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -33,66 +439,54 @@ async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         return
     
     callback_data = query.data
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await query.edit_message_text("❌ Authentication error. Please /logout and login again.")
         return
     
-    # Route to specific handlers
-    if callback_data == "cancel":
-        await query.edit_message_text("❌ Cancelled. Use /session to try again.")
-    elif callback_data.startswith("files_list:"):
-        # Import here to avoid circular dependency
-        from . import file_handlers
-        await file_handlers.list_files_command(update, context)
-    elif callback_data.startswith("files_download"):
-        from . import file_handlers
-        await file_handlers.download_file_command(update, context)
-    elif callback_data == "start_session_menu":
-        await show_skill_selection(update, context)
-    elif callback_data.startswith("start_skill:") or callback_data.startswith("quick_start:"):
-        await start_session_for_skill(update, context, callback_data)
-    elif callback_data.startswith("pause_session:"):
-        await pause_session(update, context, callback_data)
-    elif callback_data.startswith("resume_session:"):
-        await resume_session(update, context, callback_data)
-    elif callback_data.startswith("stop_session:"):
-        await stop_session(update, context, callback_data)
-    elif callback_data.startswith("schedule:"):
-        await handle_schedule_navigation(update, context, callback_data)
-    elif callback_data.startswith("stats:"):
-        await handle_stats_period(update, context, callback_data)
-    elif callback_data.startswith("note:"):
-        await handle_note_action(update, context, callback_data)
-    elif callback_data.startswith("event:"):
-        await handle_event_action(update, context, callback_data)
-    elif callback_data.startswith("reminder:"):
-        await handle_reminder_action(update, context, callback_data)
-    else:
+    # Route on the token before the first ':' (O(1) lookup instead of a prefix ladder)
+    key, _, _ = callback_data.partition(':')
+    route = ROUTES.get(key)
+    if route is None:
         await query.edit_message_text(f"Unknown action: {callback_data}")
+        return
+    
+    # Sub-handlers receive the client resolved (and auth-checked) above
+    handler, takes_data = route
+    if takes_data:
+        await handler(update, context, gql_client, callback_data)
+    else:
+        await handler(update, context, gql_client)
+
+
+async def _cancel(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
+    """Dismiss the current inline menu"""
+    await update.callback_query.edit_message_text("❌ Cancelled. Use /session to try again.")
+
+
+async def _files_list(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
+    """Route files_list: buttons to the file handlers"""
+    await file_handlers.list_files_command(update, context)
 
 
-async def show_skill_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def _files_download(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
+    """Route files_download and files_download_menu buttons to the file handlers"""
+    await file_handlers.download_file_command(update, context)
+
+
+async def show_skill_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
     """
     Show list of skills to select for starting a session
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    skills_query = """
-    query GetSkills {
-        skills {
-            id
-            name
-            level
-        }
-    }
-    """
     
     try:
-        result = await gql_client.execute(skills_query)
-        skills = result.get('skills', [])
+        skills = get_cached_skills(context)
+        if skills is None:
+            result = await gql_client.execute(_SKILLS_Q)
+            skills = result.get('skills', [])
+            cache_skills(context, skills)
         
         if not skills:
             await query.edit_message_text(
@@ -105,12 +499,7 @@ async def show_skill_selection(update: Update, context: ContextTypes.DEFAULT_TYP
         
         keyboard = []
         for skill in skills[:10]:  # Limit to 10
-            level_emoji = {
-                'BEGINNER': '🌱',
-                'INTERMEDIATE': '🌿',
-                'ADVANCED': '🌳',
-                'EXPERT': '🏆'
-            }.get(skill.get('level', ''), '📖')
+            level_emoji = _LEVEL_EMOJI.get(skill.get('level', ''), '📖')
             
             keyboard.append([
                 InlineKeyboardButton(
@@ -125,279 +514,150 @@ async def show_skill_selection(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error showing skill selection: {e}", exc_info=True)
+        logger.error("Error showing skill selection: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading skills. Try /skills command.")
 
 
-async def start_session_for_skill(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+@gql_action(
+    "starting session",
+    known_errors={
+        "already have an active session": (
+            "⚠️ **Session Already Active**\n\n"
+            "Stop your current session first.\n\n"
+            "Use /session to manage it."
+        )
+    },
+    default_msg="❌ Unexpected error. Please try /session again.",
+    error_len=200
+    # No retry: startSession creates a session - a timed-out attempt may have succeeded
+)
+async def start_session_for_skill(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Start a new session for the selected skill
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
     # Extract skill ID from callback_data (works for both start_skill: and quick_start:)
-    skill_id = callback_data.split(':')[1]
+    _, _, skill_id = callback_data.partition(':')
     
-    # Get skill details
-    skill_query = """
-    query GetSkill($id: UUID!) {
-        skill(id: $id) {
-            id
-            name
-        }
-    }
-    """
+    # Name comes from the cached skill list the button was picked from
+    skills = get_cached_skills(context) or []
+    known_name = next((s['name'] for s in skills if s['id'] == skill_id), None)
+    session_name = f"{known_name} practice" if known_name else "practice"
     
-    # Start session mutation
-    start_mutation = """
-    mutation StartSession($skillId: UUID!, $name: String!) {
-        startSession(skillId: $skillId, name: $name) {
-            id
-            name
-            status
-            startedAt
-        }
-    }
-    """
+    session_result = await gql_client.execute(_START_SESSION_MUT, {
+        'skillId': skill_id,
+        'name': session_name
+    })
     
-    try:
-        # Get skill name
-        skill_result = await gql_client.execute(skill_query, {'id': skill_id})
-        skill = skill_result.get('skill')
-        
-        if not skill:
-            await query.edit_message_text("❌ Skill not found.")
-            return
-        
-        skill_name = skill['name']
-        session_name = f"{skill_name} practice"
-        
-        # Start the session
-        session_result = await gql_client.execute(start_mutation, {
-            'skillId': skill_id,
-            'name': session_name
-        })
-        
-        session = session_result.get('startSession')
-        
-        if session:
-            message = f"✅ **Session Started!**\n\n"
-            message += f"📚 {skill_name}\n"
-            message += f"⏱️ Timer running...\n\n"
-            message += f"Use /session to pause or stop."
-            
-            await query.edit_message_text(message, parse_mode='Markdown')
-        else:
-            await query.edit_message_text("❌ Failed to start session.")
-            
-    except TimeoutError:
-        logger.error("Timeout starting session")
-        await query.edit_message_text(
-            "⏱️ **Request Timed Out**\n\n"
-            "Backend is taking too long. Try again shortly.",
-            parse_mode='Markdown'
-        )
-    except TransportQueryError as e:
-        # Handle GraphQL-specific errors
-        error_data = e.errors[0] if e.errors else {}
-        error_msg = error_data.get('message', str(e))
-        logger.error(f"GraphQL error starting session: {error_msg}")
-        
-        if "already have an active session" in error_msg.lower():
-            await query.edit_message_text(
-                "⚠️ **Session Already Active**\n\n"
-                "Stop your current session first.\n\n"
-                "Use /session to manage it.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text(f"❌ Error: {error_msg[:200]}")
-            
-    except Exception as e:
-        logger.error(f"Error starting session: {e}", exc_info=True)
-        await query.edit_message_text(f"❌ Unexpected error. Please try /session again.")
+    session = session_result.get('startSession')
+    
+    if session:
+        skill_name = session['skill']['name']
+        message = f"✅ **Session Started!**\n\n"
+        message += f"📚 {skill_name}\n"
+        message += f"⏱️ Timer running...\n\n"
+        message += f"Use /session to pause or stop."
+        
+        await query.edit_message_text(message, parse_mode='Markdown')
+    else:
+        await query.edit_message_text("❌ Failed to start session.")
 
 
-async def pause_session(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+@gql_action(
+    "pausing session",
+    known_errors={"not found": "⚠️ Session not found. It may have been stopped.\n\nUse /session to check."},
+    default_msg="❌ Unexpected error. Use /session to check status.",
+    retry=True,
+    already_done=("session is not active", _PAUSED_MSG)
+)
+async def pause_session(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Pause the active session
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    session_id = callback_data.split(':')[1]
+    _, _, session_id = callback_data.partition(':')
     
-    mutation = """
-    mutation PauseSession($id: UUID!) {
-        pauseSession(id: $id) {
-            id
-            status
-        }
-    }
-    """
+    result = await gql_client.execute(_PAUSE_SESSION_MUT, {'id': session_id})
     
-    try:
-        result = await gql_client.execute(mutation, {'id': session_id})
-        
-        if result.get('pauseSession'):
-            await query.edit_message_text(
-                "⏸️ **Session Paused**\n\nUse /session to resume or stop.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text("❌ Failed to pause session.")
-            
-    except TimeoutError:
-        logger.error("Timeout pausing session")
-        await query.edit_message_text(
-            "⏱️ **Request Timed Out**\n\n"
-            "Backend is taking too long. Try again shortly.",
-            parse_mode='Markdown'
-        )
-    except TransportQueryError as e:
-        error_data = e.errors[0] if e.errors else {}
-        error_msg = error_data.get('message', str(e))
-        logger.error(f"GraphQL error pausing session: {error_msg}")
-        
-        if "not found" in error_msg.lower():
-            await query.edit_message_text(
-                "⚠️ Session not found. It may have been stopped.\n\nUse /session to check.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text(f"❌ Error: {error_msg[:150]}")
-            
-    except Exception as e:
-        logger.error(f"Error pausing session: {e}", exc_info=True)
-        await query.edit_message_text("❌ Unexpected error. Use /session to check status.")
+    if result.get('pauseSession'):
+        await query.edit_message_text(_PAUSED_MSG, parse_mode='Markdown')
+    else:
+        await query.edit_message_text("❌ Failed to pause session.")
 
 
-async def resume_session(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+@gql_action(
+    "resuming session",
+    known_errors={"not found": "⚠️ Session not found. It may have been stopped.\n\nUse /session to check."},
+    default_msg="❌ Unexpected error. Use /session to check status.",
+    retry=True,
+    already_done=("session is not paused", _RESUMED_MSG)
+)
+async def resume_session(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Resume a paused session
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    session_id = callback_data.split(':')[1]
+    _, _, session_id = callback_data.partition(':')
     
-    mutation = """
-    mutation ResumeSession($id: UUID!) {
-        resumeSession(id: $id) {
-            id
-            status
-        }
-    }
-    """
+    result = await gql_client.execute(_RESUME_SESSION_MUT, {'id': session_id})
     
-    try:
-        result = await gql_client.execute(mutation, {'id': session_id})
-        
-        if result.get('resumeSession'):
-            await query.edit_message_text(
-                "▶️ **Session Resumed**\n\nTimer is running. Use /session for controls.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text("❌ Failed to resume session.")
-            
-    except TimeoutError:
-        logger.error("Timeout resuming session")
-        await query.edit_message_text(
-            "⏱️ **Request Timed Out**\n\n"
-            "Backend is taking too long. Try again shortly.",
-            parse_mode='Markdown'
-        )
-    except TransportQueryError as e:
-        error_data = e.errors[0] if e.errors else {}
-        error_msg = error_data.get('message', str(e))
-        logger.error(f"GraphQL error resuming session: {error_msg}")
-        
-        if "not found" in error_msg.lower():
-            await query.edit_message_text(
-                "⚠️ Session not found. It may have been stopped.\n\nUse /session to check.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text(f"❌ Error: {error_msg[:150]}")
-            
-    except Exception as e:
-        logger.error(f"Error resuming session: {e}", exc_info=True)
-        await query.edit_message_text("❌ Unexpected error. Use /session to check status.")
+    if result.get('resumeSession'):
+        await query.edit_message_text(_RESUMED_MSG, parse_mode='Markdown')
+    else:
+        await query.edit_message_text("❌ Failed to resume session.")
 
 
-async def stop_session(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+@gql_action(
+    "stopping session",
+    known_errors={
+        "not found": (
+            "⚠️ Session not found. It may have already been stopped.\n\n"
+            "Use /session to check status."
+        )
+    },
+    default_msg="❌ Unexpected error. Use /session to check status.",
+    retry=True,
+    already_done=(
+        "session is not active or paused",
+        "⏹️ **Session Completed**\n\n✨ Great work! Use /session to start another."
+    )
+)
+async def stop_session(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Stop the active session
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    session_id = callback_data.split(':')[1]
+    _, _, session_id = callback_data.partition(':')
     
-    mutation = """
-    mutation StopSession($id: UUID!) {
-        stopSession(id: $id) {
-            id
-            status
-            duration
-        }
-    }
-    """
+    result = await gql_client.execute(_STOP_SESSION_MUT, {'id': session_id})
+    session = result.get('stopSession')
     
-    try:
-        result = await gql_client.execute(mutation, {'id': session_id})
-        session = result.get('stopSession')
-        
-        if session:
-            duration = session.get('duration', 0)
-            hours = duration // 60
-            minutes = duration % 60
-            duration_str = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
-            
-            message = f"⏹️ **Session Completed**\n\n"
-            message += f"⏱️ Duration: {duration_str}\n\n"
-            message += f"✨ Great work! Use /session to start another."
-            
-            await query.edit_message_text(message, parse_mode='Markdown')
-        else:
-            await query.edit_message_text("❌ Failed to stop session.")
-            
-    except TimeoutError:
-        logger.error("Timeout stopping session")
-        await query.edit_message_text(
-            "⏱️ **Request Timed Out**\n\n"
-            "Backend is taking too long. Try again shortly.",
-            parse_mode='Markdown'
-        )
-    except TransportQueryError as e:
-        error_data = e.errors[0] if e.errors else {}
-        error_msg = error_data.get('message', str(e))
-        logger.error(f"GraphQL error stopping session: {error_msg}")
+    if session:
+        duration = session.get('duration', 0)
+        hours = duration // 60
+        minutes = duration % 60
+        duration_str = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
         
-        if "not found" in error_msg.lower():
-            await query.edit_message_text(
-                "⚠️ Session not found. It may have already been stopped.\n\n"
-                "Use /session to check status.",
-                parse_mode='Markdown'
-            )
-        else:
-            await query.edit_message_text(f"❌ Error: {error_msg[:150]}")
-            
-    except Exception as e:
-        logger.error(f"Error stopping session: {e}", exc_info=True)
-        await query.edit_message_text("❌ Unexpected error. Use /session to check status.")
+        message = f"⏹️ **Session Completed**\n\n"
+        message += f"⏱️ Duration: {duration_str}\n\n"
+        message += f"✨ Great work! Use /session to start another."
+        
+        await query.edit_message_text(message, parse_mode='Markdown')
+    else:
+        await query.edit_message_text("❌ Failed to stop session.")
 
 
-async def handle_schedule_navigation(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+async def handle_schedule_navigation(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Handle schedule navigation (yesterday/tomorrow/week/month)
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    action = callback_data.split(':')[1]
+    _, _, action = callback_data.partition(':')
     
     # Calculate dates based on action
     today = date.today()
@@ -416,28 +676,13 @@ async def handle_schedule_navigation(update: Update, context: ContextTypes.DEFAU
         end_date = week_start + timedelta(days=6)
     elif action == "month":
         target_date = today.replace(day=1)
-        # Get last day of month
-        next_month = today.replace(day=28) + timedelta(days=4)
-        end_date = next_month - timedelta(days=next_month.day)
+        end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1])
     else:
         target_date = today
         end_date = today
     
-    events_query = """
-    query GetEvents($startDate: Date!, $endDate: Date!) {
-        events(startDate: $startDate, endDate: $endDate) {
-            id
-            title
-            startTime
-            endTime
-            type
-            allDay
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(events_query, {
+        result = await gql_client.execute(_EVENTS_Q, {
             'startDate': target_date.isoformat(),
             'endDate': end_date.isoformat()
         })
@@ -448,78 +693,54 @@ async def handle_schedule_navigation(update: Update, context: ContextTypes.DEFAU
         sorted_events = sorted(events, key=lambda e: e.get('startTime', ''))
         
         if action == "week":
-            message = f"📅 **Week of {target_date.strftime('%B %d')}**\n\n"
+            parts = [f"📅 **Week of {target_date.strftime('%B %d')}**\n\n"]
         elif action == "month":
-            message = f"📅 **{target_date.strftime('%B %Y')}**\n\n"
+            parts = [f"📅 **{target_date.strftime('%B %Y')}**\n\n"]
         else:
-            message = f"📅 **{target_date.strftime('%A, %B %d, %Y')}**\n\n"
+            parts = [f"📅 **{_fmt_date(target_date)}**\n\n"]
         
         if not sorted_events:
-            message += "🌟 No events scheduled!\n"
+            parts.append("🌟 No events scheduled!\n")
         else:
             for event in sorted_events[:15]:  # Show more for week/month
-                type_emoji = {
-                    'ACTIVITY': '✅',
-                    'MEETING': '👥',
-                    'LEARNING': '📚',
-                    'REMINDER': '🔔',
-                    'CUSTOM': '📌'
-                }.get(event.get('type', ''), '📌')
+                type_emoji = TYPE_EMOJI.get(event.get('type', ''), '📌')
                 
-                title = event['title']
+                title = _clip(event['title'])
                 start_time = event.get('startTime')
                 all_day = event.get('allDay', False)
                 
                 if all_day:
-                    message += f"{type_emoji} 🌅 **All Day** - {title}\n"
+                    parts.append(f"{type_emoji} 🌅 **All Day** - {title}\n")
                 elif start_time:
-                    from datetime import datetime
-                    dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+                    dt = _parse_iso(start_time)
                     if action in ["week", "month"]:
-                        date_str = dt.strftime('%m/%d')
-                        time_str = dt.strftime('%I:%M %p')
-                        message += f"{type_emoji} {date_str} **{time_str}** - {title}\n"
+                        date_str = f"{dt.month:02d}/{dt.day:02d}"
+                        time_str = _fmt_12h(dt)
+                        parts.append(f"{type_emoji} {date_str} **{time_str}** - {title}\n")
                     else:
-                        time_str = dt.strftime('%I:%M %p')
-                        message += f"{type_emoji} **{time_str}** - {title}\n"
+                        time_str = _fmt_12h(dt)
+                        parts.append(f"{type_emoji} **{time_str}** - {title}\n")
                 else:
-                    message += f"{type_emoji} {title}\n"
+                    parts.append(f"{type_emoji} {title}\n")
             
             if len(sorted_events) > 15:
-                message += f"\n_...and {len(sorted_events) - 15} more events._\n"
-        
-        # Navigation buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("◀️ Yesterday", callback_data="schedule:yesterday"),
-                InlineKeyboardButton("Tomorrow ▶️", callback_data="schedule:tomorrow")
-            ],
-            [
-                InlineKeyboardButton("📆 This Week", callback_data="schedule:week"),
-                InlineKeyboardButton("📅 This Month", callback_data="schedule:month")
-            ],
-            [
-                InlineKeyboardButton("⏺️ Today", callback_data="schedule:today"),
-                InlineKeyboardButton("➕ New Event", callback_data="event:create")
-            ]
-        ]
+                parts.append(f"\n_...and {len(sorted_events) - 15} more events._\n")
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        message = ''.join(parts)
+        await query.edit_message_text(message, reply_markup=_SCHEDULE_NAV_MARKUP, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error navigating schedule: {e}", exc_info=True)
+        logger.error("Error navigating schedule: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading schedule.")
 
 
-async def handle_stats_period(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+async def handle_stats_period(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Handle stats period selection (today/week/month)
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    period = callback_data.split(':')[1]
+    _, _, period = callback_data.partition(':')
     
     today = date.today()
     
@@ -533,138 +754,102 @@ async def handle_stats_period(update: Update, context: ContextTypes.DEFAULT_TYPE
         period_label = "This Week"
     elif period == "month":
         start_date = today.replace(day=1)
-        # Get last day of month
-        next_month = today.replace(day=28) + timedelta(days=4)
-        end_date = (next_month - timedelta(days=next_month.day))
+        end_date = today.replace(day=calendar.monthrange(today.year, today.month)[1])
         period_label = "This Month"
     else:
         start_date = today
         end_date = today
         period_label = "Today"
     
-    stats_query = """
-    query GetStats($startDate: Date!, $endDate: Date!) {
-        activityStats(startDate: $startDate, endDate: $endDate) {
-            totalActivities
-            totalMinutes
-            totalHours
-            skillBreakdown {
-                skillName
-                activityCount
-                totalHours
-            }
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(stats_query, {
+        result = await gql_client.execute(_STATS_Q, {
             'startDate': start_date.isoformat(),
             'endDate': end_date.isoformat()
         })
         
         stats = result.get('activityStats', {})
         
-        message = f"📊 **Stats: {period_label}**\n\n"
-        message += f"• Activities: {stats.get('totalActivities', 0)}\n"
-        message += f"• Time: {stats.get('totalHours', 0):.1f} hours\n\n"
+        parts = [
+            f"📊 **Stats: {period_label}**\n\n",
+            f"• Activities: {stats.get('totalActivities', 0)}\n",
+            f"• Time: {stats.get('totalHours', 0):.1f} hours\n\n"
+        ]
         
         # Top skills
         skill_breakdown = stats.get('skillBreakdown', [])
         if skill_breakdown:
-            message += "**Top Skills:**\n"
+            parts.append("**Top Skills:**\n")
             for skill_stat in skill_breakdown[:5]:
-                skill_name = skill_stat['skillName']
+                skill_name = _clip(skill_stat['skillName'])
                 hours = skill_stat['totalHours']
-                message += f"• {skill_name}: {hours:.1f}h\n"
+                parts.append(f"• {skill_name}: {hours:.1f}h\n")
         
-        # Period selector buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("Today", callback_data="stats:today"),
-                InlineKeyboardButton("Week", callback_data="stats:week"),
-                InlineKeyboardButton("Month", callback_data="stats:month")
-            ]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        message = ''.join(parts)
+        await query.edit_message_text(message, reply_markup=_STATS_NAV_MARKUP, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error loading stats: {e}", exc_info=True)
+        logger.error("Error loading stats: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading stats.")
 
 
 # ======== Note Handlers ========
 
-async def handle_note_action(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> int:
+async def handle_note_action(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> int:
     """
     Handle note-related actions
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    parts = callback_data.split(':')
+    parts = callback_data.split(':', 2)
     action = parts[1]
     
-    if action == "create":
-        await query.edit_message_text(
-            "📝 **Create New Note**\n\n"
-            "Please send your note in this format:\n\n"
-            "`Title\nContent\n#tag1 #tag2`\n\n"
-            "Example:\n"
-            "`Meeting Notes\nDiscussed Q1 goals\n#work #meeting`\n\n"
-            "Or just send a simple message and I'll create a note from it.",
-            parse_mode='Markdown'
-        )
-        context.user_data['awaiting_note'] = True
-        return ConversationHandler.END
+    match action:
+        case "create":
+            await query.edit_message_text(
+                "📝 **Create New Note**\n\n"
+                "Please send your note in this format:\n\n"
+                "`Title\nContent\n#tag1 #tag2`\n\n"
+                "Example:\n"
+                "`Meeting Notes\nDiscussed Q1 goals\n#work #meeting`\n\n"
+                "Or just send a simple message and I'll create a note from it.",
+                parse_mode='Markdown'
+            )
+            context.user_data['awaiting'] = 'note'
+            return ConversationHandler.END
         
-    elif action == "list":
-        await show_notes_list(update, context)
+        case "list":
+            await show_notes_list(update, context, gql_client)
         
-    elif action == "view":
-        note_id = parts[2]
-        await show_note_detail(update, context, note_id)
+        case "view":
+            note_id = parts[2]
+            await show_note_detail(update, context, gql_client, note_id)
         
-    elif action == "delete":
-        note_id = parts[2]
-        await delete_note(update, context, note_id)
+        case "delete":
+            note_id = parts[2]
+            await delete_note(update, context, gql_client, note_id)
         
-    elif action == "search":
-        await query.edit_message_text(
-            "🔍 **Search Notes**\n\n"
-            "Send me keywords to search your notes.",
-            parse_mode='Markdown'
-        )
-        context.user_data['awaiting_note_search'] = True
-        return ConversationHandler.END
+        case "search":
+            await query.edit_message_text(
+                "🔍 **Search Notes**\n\n"
+                "Send me keywords to search your notes.",
+                parse_mode='Markdown'
+            )
+            context.user_data['awaiting'] = 'note_search'
+            return ConversationHandler.END
 
 
-async def show_notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def show_notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
     """
     Show list of notes
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    notes_query = """
-    query GetNotes($limit: Int!) {
-        notes(limit: $limit) {
-            nodes {
-                id
-                title
-                content
-                tags
-                createdAt
-            }
-        }
-    }
-    """
     
     try:
-        result = await gql_client.execute(notes_query, {'limit': 10})
-        notes_data = result.get('notes', {}).get('nodes', [])
+        # Fetch only what is rendered; totalCount drives the "...and N more" hint
+        result = await gql_client.execute(_NOTES_Q, {'limit': 5})
+        notes_page = result.get('notes', {})
+        notes_data = notes_page.get('nodes', [])
+        total_count = notes_page.get('totalCount', len(notes_data))
         
         if not notes_data:
             message = "📝 **No Notes Yet**\n\nCreate your first note!"
@@ -675,20 +860,20 @@ async def show_notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
             return
         
-        message = f"📝 **Recent Notes** ({len(notes_data)})\n\n"
+        parts = [f"📝 **Recent Notes** ({total_count})\n\n"]
         
         keyboard = []
-        for i, note in enumerate(notes_data[:5]):
+        for i, note in enumerate(notes_data):
             title = note['title']
             tags = note.get('tags', [])
             tags_str = ' '.join(f'#{tag}' for tag in tags[:2]) if tags else ''
             
             # Truncate title if too long
             display_title = title[:35] + '...' if len(title) > 35 else title
-            message += f"{i+1}. **{title}**"
+            parts.append(f"{i+1}. **{_clip(title)}**")
             if tags_str:
-                message += f" {tags_str}"
-            message += "\n"
+                parts.append(f" {tags_str}")
+            parts.append("\n")
             
             # Add button for each note
             keyboard.append([InlineKeyboardButton(
@@ -696,8 +881,8 @@ async def show_notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                 callback_data=f"note:view:{note['id']}"
             )])
         
-        if len(notes_data) > 5:
-            message += f"\n_...and {len(notes_data) - 5} more._\n"
+        if total_count > len(notes_data):
+            parts.append(f"\n_...and {total_count - len(notes_data)} more._\n")
         
         # Add action buttons
         keyboard.append([
@@ -705,43 +890,30 @@ async def show_notes_list(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             InlineKeyboardButton("🔍 Search", callback_data="note:search")
         ])
         
+        message = ''.join(parts)
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error showing notes list: {e}", exc_info=True)
+        logger.error("Error showing notes list: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading notes.")
 
 
-async def show_note_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, note_id: str) -> None:
+async def show_note_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, note_id: str) -> None:
     """
     Show detailed view of a note
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    note_query = """
-    query GetNote($id: UUID!) {
-        note(id: $id) {
-            id
-            title
-            content
-            tags
-            createdAt
-            updatedAt
-        }
-    }
-    """
     
     try:
-        result = await gql_client.execute(note_query, {'id': note_id})
+        result = await gql_client.execute(_NOTE_Q, {'id': note_id})
         note = result.get('note')
         
         if not note:
             await query.edit_message_text("❌ Note not found.")
             return
         
-        title = note['title']
+        title = _clip(note['title'])
         content = note['content']
         tags = note.get('tags', [])
         created_at = note.get('createdAt', '')
@@ -754,13 +926,12 @@ async def show_note_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, n
         message += f"{content}\n\n"
         
         if tags:
-            tags_str = ' '.join(f'#{tag}' for tag in tags)
+            tags_str = _clip(' '.join(f'#{tag}' for tag in tags))
             message += f"🏷️ {tags_str}\n\n"
         
         if created_at:
-            from datetime import datetime
             try:
-                dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                dt = _parse_iso(created_at)
                 message += f"📅 Created: {dt.strftime('%B %d, %Y at %I:%M %p')}\n"
             except:
                 pass
@@ -776,25 +947,18 @@ async def show_note_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, n
         await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error showing note detail: {e}", exc_info=True)
+        logger.error("Error showing note detail: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading note.")
 
 
-async def delete_note(update: Update, context: ContextTypes.DEFAULT_TYPE, note_id: str) -> None:
+async def delete_note(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, note_id: str) -> None:
     """
     Delete a note
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    mutation = """
-    mutation DeleteNote($id: UUID!) {
-        deleteNote(id: $id)
-    }
-    """
     
     try:
-        await gql_client.execute(mutation, {'id': note_id})
+        await gql_client.execute(_DELETE_NOTE_MUT, {'id': note_id})
         await query.edit_message_text(
             "✅ **Note Deleted**\n\n"
             "The note has been removed.\n\n"
@@ -802,52 +966,56 @@ async def delete_note(update: Update, context: ContextTypes.DEFAULT_TYPE, note_i
             parse_mode='Markdown'
         )
     except Exception as e:
-        logger.error(f"Error deleting note: {e}", exc_info=True)
+        logger.error("Error deleting note: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error deleting note.")
 
 
 # ======== Event Handlers ========
 
-async def handle_event_action(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> int:
+async def handle_event_action(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> int:
     """
     Handle event-related actions
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    parts = callback_data.split(':')
+    parts = callback_data.split(':', 2)
     action = parts[1]
     
-    if action == "create":
-        await query.edit_message_text(
-            "📅 **Create New Event**\n\n"
-            "Please send your event in this format:\n\n"
-            "`Title\nDate Time (YYYY-MM-DD HH:MM)\nDuration (minutes)\nType (LEARNING/MEETING/REMINDER)`\n\n"
-            "Example:\n"
-            "`Team Meeting\n2026-02-13 14:00\n60\nMEETING`\n\n"
-            "Or use templates below:",
-            parse_mode='Markdown'
-        )
-        context.user_data['awaiting_event'] = True
-        return ConversationHandler.END
+    match action:
+        case "create":
+            await query.edit_message_text(
+                "📅 **Create New Event**\n\n"
+                "Please send your event in this format:\n\n"
+                "`Title\nDate Time (YYYY-MM-DD HH:MM)\nDuration (minutes)\nType (LEARNING/MEETING/REMINDER)`\n\n"
+                "Example:\n"
+                "`Team Meeting\n2026-02-13 14:00\n60\nMEETING`\n\n"
+                "Or use templates below:",
+                parse_mode='Markdown'
+            )
+            context.user_data['awaiting'] = 'event'
+            return ConversationHandler.END
+        
+        case "templates":
+            await show_event_templates(update, context, gql_client)
         
-    elif action == "templates":
-        await show_event_templates(update, context)
+        case "template":
+            template_type = parts[2]
+            await create_event_from_template(update, context, gql_client, template_type)
         
-    elif action == "template":
-        template_type = parts[2]
-        await create_event_from_template(update, context, template_type)
+        case "view":
+            event_id = parts[2]
+            await show_event_detail(update, context, gql_client, event_id)
         
-    elif action == "view":
-        event_id = parts[2]
-        await show_event_detail(update, context, event_id)
+        case "details":
+            event_id = parts[2]
+            await show_event_detail(update, context, gql_client, event_id, full=True)
         
-    elif action == "delete":
-        event_id = parts[2]
-        await delete_event(update, context, event_id)
+        case "delete":
+            event_id = parts[2]
+            await delete_event(update, context, gql_client, event_id)
 
 
-async def show_event_templates(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def show_event_templates(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
     """
     Show quick event templates
     """
@@ -859,93 +1027,67 @@ async def show_event_templates(update: Update, context: ContextTypes.DEFAULT_TYP
     message += "📚 **Study Session** - 1 hour learning session\n"
     message += "🔔 **Reminder** - Quick reminder for later today\n"
     
-    keyboard = [
-        [InlineKeyboardButton("⏰ Quick Meeting", callback_data="event:template:meeting")],
-        [InlineKeyboardButton("📚 Study Session", callback_data="event:template:study")],
-        [InlineKeyboardButton("🔔 Reminder", callback_data="event:template:reminder")],
-        [InlineKeyboardButton("« Back", callback_data="schedule:today")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(message, reply_markup=_EVENT_TEMPLATES_MARKUP, parse_mode='Markdown')
 
 
-async def create_event_from_template(update: Update, context: ContextTypes.DEFAULT_TYPE, template_type: str) -> None:
+async def create_event_from_template(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, template_type: str) -> None:
     """
     Create an event from a template
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    from datetime import datetime, timedelta
+    template = _EVENT_TEMPLATES.get(template_type)
+    if template is None:
+        await query.edit_message_text("❌ Invalid template type.")
+        return
     
+    title, start_offset, end_offset, event_type = template
     now = datetime.now()
+    start_time = now + start_offset
+    end_time = now + end_offset
     
-    if template_type == "meeting":
-        title = "Team Meeting"
-        start_time = now
-        end_time = now + timedelta(minutes=30)
-        event_type = "MEETING"
-        
-    elif template_type == "study":
-        title = "Study Session"
-        start_time = now
-        end_time = now + timedelta(hours=1)
-        event_type = "LEARNING"
-        
-    elif template_type == "reminder":
-        title = "Reminder"
-        start_time = now + timedelta(hours=2)
-        end_time = now + timedelta(hours=2, minutes=15)
-        event_type = "REMINDER"
-    else:
-        await query.edit_message_text("❌ Invalid template type.")
-        return
+    # Set state first so a fast reply is routed even if the edit is slow
+    context.user_data['event_template'] = EventTemplate(
+        title, event_type, start_time.isoformat(), end_time.isoformat()
+    )
+    context.user_data['awaiting'] = 'event_title'
     
     # Ask for title customization
     await query.edit_message_text(
         f"📅 **Creating {title}**\n\n"
-        f"Start: {start_time.strftime('%I:%M %p')}\n"
-        f"End: {end_time.strftime('%I:%M %p')}\n"
+        f"Start: {_fmt_12h(start_time)}\n"
+        f"End: {_fmt_12h(end_time)}\n"
         f"Type: {event_type}\n\n"
         "Send a custom title, or type 'confirm' to create with default settings.",
         parse_mode='Markdown'
     )
-    
-    context.user_data['event_template'] = {
-        'title': title,
-        'start_time': start_time.isoformat(),
-        'end_time': end_time.isoformat(),
-        'type': event_type
-    }
-    context.user_data['awaiting_event_title'] = True
 
 
-async def show_event_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, event_id: str) -> None:
+@lru_cache(maxsize=256)
+def _event_detail_markup(event_id: str, full: bool) -> InlineKeyboardMarkup:
+    """Event detail keyboard - only the event id varies, so markups are reused"""
+    keyboard = [
+        [
+            InlineKeyboardButton("🗑️ Delete", callback_data=f"event:delete:{event_id}"),
+            InlineKeyboardButton("« Back", callback_data="schedule:today")
+        ]
+    ]
+    if not full:
+        keyboard.insert(0, [InlineKeyboardButton("ℹ️ Details", callback_data=f"event:details:{event_id}")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+async def show_event_detail(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, event_id: str, full: bool = False) -> None:
     """
     Show detailed view of an event
-    """
-    query = update.callback_query
-    gql_client = get_user_client(context)
     
-    event_query = """
-    query GetEvent($id: UUID!) {
-        event(id: $id) {
-            id
-            title
-            description
-            startTime
-            endTime
-            type
-            allDay
-            location
-            attendees
-        }
-    }
+    The summary view only fetches title/time/type; full=True (the Details
+    button) also loads description, location and attendees.
     """
+    query = update.callback_query
     
     try:
-        result = await gql_client.execute(event_query, {'id': event_id})
+        result = await gql_client.execute(_EVENT_FULL_Q if full else _EVENT_MIN_Q, {'id': event_id})
         event = result.get('event')
         
         if not event:
@@ -961,67 +1103,48 @@ async def show_event_detail(update: Update, context: ContextTypes.DEFAULT_TYPE,
         location = event.get('location', '')
         attendees = event.get('attendees', [])
         
-        type_emoji = {
-            'ACTIVITY': '✅',
-            'MEETING': '👥',
-            'LEARNING': '📚',
-            'REMINDER': '🔔',
-            'CUSTOM': '📌'
-        }.get(event_type, '📌')
+        type_emoji = TYPE_EMOJI.get(event_type, '📌')
         
-        message = f"{type_emoji} **{title}**\n\n"
+        # HTML with escaped user fields - titles with * or _ would break Markdown parsing
+        parts = [f"{type_emoji} <b>{_clip_html(title)}</b>\n\n"]
         
         if all_day:
-            message += "🌅 All Day Event\n\n"
+            parts.append("🌅 All Day Event\n\n")
         elif start_time and end_time:
-            from datetime import datetime
             try:
-                start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-                end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
-                message += f"🕐 {start_dt.strftime('%I:%M %p')} - {end_dt.strftime('%I:%M %p')}\n"
-                message += f"📅 {start_dt.strftime('%A, %B %d, %Y')}\n\n"
+                start_dt = _parse_iso(start_time)
+                end_dt = _parse_iso(end_time)
+                parts.append(f"🕐 {_fmt_12h(start_dt)} - {_fmt_12h(end_dt)}\n📅 {_fmt_date(start_dt)}\n\n")
             except:
                 pass
         
         if description:
-            message += f"{description}\n\n"
+            parts.append(f"{_clip_html(description, _MAX_TEXT_CHARS)}\n\n")
         
         if location:
-            message += f"📍 {location}\n\n"
+            parts.append(f"📍 {_clip_html(location)}\n\n")
         
         if attendees:
-            message += f"👥 Attendees: {', '.join(attendees)}\n\n"
+            parts.append(f"👥 Attendees: {_clip_html(', '.join(attendees), _MAX_TEXT_CHARS)}\n\n")
         
-        keyboard = [
-            [
-                InlineKeyboardButton("🗑️ Delete", callback_data=f"event:delete:{event_id}"),
-                InlineKeyboardButton("« Back", callback_data="schedule:today")
-            ]
-        ]
+        message = ''.join(parts)
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+        reply_markup = _event_detail_markup(event_id, full)
+        await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='HTML')
         
     except Exception as e:
-        logger.error(f"Error showing event detail: {e}", exc_info=True)
+        logger.error("Error showing event detail: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading event.")
 
 
-async def delete_event(update: Update, context: ContextTypes.DEFAULT_TYPE, event_id: str) -> None:
+async def delete_event(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, event_id: str) -> None:
     """
     Delete an event
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    mutation = """
-    mutation DeleteEvent($id: UUID!) {
-        deleteEvent(id: $id)
-    }
-    """
     
     try:
-        await gql_client.execute(mutation, {'id': event_id})
+        await gql_client.execute(_DELETE_EVENT_MUT, {'id': event_id})
         await query.edit_message_text(
             "✅ **Event Deleted**\n\n"
             "The event has been removed from your calendar.\n\n"
@@ -1029,22 +1152,21 @@ async def delete_event(update: Update, context: ContextTypes.DEFAULT_TYPE, event
             parse_mode='Markdown'
         )
     except Exception as e:
-        logger.error(f"Error deleting event: {e}", exc_info=True)
+        logger.error("Error deleting event: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error deleting event.")
 
 
-async def handle_reminder_action(update: Update, context: ContextTypes.DEFAULT_TYPE, callback_data: str) -> None:
+async def handle_reminder_action(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, callback_data: str) -> None:
     """
     Handle reminder-related callback actions
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
     
-    parts = callback_data.split(":")
+    parts = callback_data.split(":", 2)
     action = parts[1] if len(parts) > 1 else None
     
     if action == "complete" and len(parts) > 2:
-        await complete_reminder(update, context, parts[2])
+        await complete_reminder(update, context, gql_client, parts[2])
     elif action == "create":
         await query.edit_message_text(
             "📝 **Create Reminder**\n\n"
@@ -1056,32 +1178,21 @@ async def handle_reminder_action(update: Update, context: ContextTypes.DEFAULT_T
             "Priority can be: LOW, MEDIUM, or HIGH",
             parse_mode='Markdown'
         )
-        context.user_data['awaiting_reminder'] = True
+        context.user_data['awaiting'] = 'reminder'
     elif action == "all":
-        await show_all_reminders(update, context)
+        await show_all_reminders(update, context, gql_client)
     else:
         await query.edit_message_text("❌ Unknown reminder action.")
 
 
-async def complete_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE, reminder_id: str) -> None:
+async def complete_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient, reminder_id: str) -> None:
     """
     Mark a reminder as complete
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    mutation = """
-    mutation CompleteReminder($id: UUID!) {
-        updateReminder(id: $id, input: {completed: true}) {
-            id
-            title
-            completed
-        }
-    }
-    """
     
     try:
-        result = await gql_client.execute(mutation, {'id': reminder_id})
+        result = await gql_client.execute(_COMPLETE_REMINDER_MUT, {'id': reminder_id})
         reminder = result.get('updateReminder')
         
         if reminder:
@@ -1095,35 +1206,18 @@ async def complete_reminder(update: Update, context: ContextTypes.DEFAULT_TYPE,
             await query.edit_message_text("❌ Failed to complete reminder.")
     
     except Exception as e:
-        logger.error(f"Error completing reminder: {e}", exc_info=True)
+        logger.error("Error completing reminder: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error completing reminder. Please try again.")
 
 
-async def show_all_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def show_all_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client: GraphQLClient) -> None:
     """
     Show all reminders (completed and incomplete)
     """
     query = update.callback_query
-    gql_client = get_user_client(context)
-    
-    reminders_query = """
-    query GetAllReminders($limit: Int!) {
-        reminders(limit: $limit) {
-            nodes {
-                id
-                title
-                dueTime
-                completed
-                priority
-            }
-        }
-    }
-    """
     
     try:
-        from datetime import datetime
-        
-        result = await gql_client.execute(reminders_query, {'limit': 20})
+        result = await gql_client.execute(_ALL_REMINDERS_Q, {'limit': 20})
         reminders = result.get('reminders', {}).get('nodes', [])
         
         if not reminders:
@@ -1144,9 +1238,9 @@ async def show_all_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE)
         if incomplete:
             message += "**Active:**\n"
             for reminder in incomplete[:5]:
-                due_time = datetime.fromisoformat(reminder['dueTime'].replace('Z', '+00:00'))
-                priority_emoji = {'LOW': '🔵', 'MEDIUM': '🟡', 'HIGH': '🔴'}.get(reminder['priority'], '⚪')
-                message += f"{priority_emoji} {reminder['title']}\n"
+                due_time = _parse_iso(reminder['dueTime'])
+                priority_emoji = _PRIORITY_EMOJI.get(reminder['priority'], '⚪')
+                message += f"{priority_emoji} {_clip(reminder['title'])}\n"
                 message += f"   Due: {due_time.strftime('%b %d, %I:%M %p')}\n"
         
         if completed:
@@ -1158,6 +1252,25 @@ async def show_all_reminders(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error showing all reminders: {e}", exc_info=True)
+        logger.error("Error showing all reminders: %s", e, exc_info=True)
         await query.edit_message_text("❌ Error loading reminders. Please try again.")
 
+
+# Callback routing table: prefix -> (handler, whether it takes callback_data)
+ROUTES = {
+    'cancel': (_cancel, False),
+    'files_list': (_files_list, False),
+    'files_download': (_files_download, False),
+    'files_download_menu': (_files_download, False),
+    'start_session_menu': (show_skill_selection, False),
+    'start_skill': (start_session_for_skill, True),
+    'quick_start': (start_session_for_skill, True),
+    'pause_session': (pause_session, True),
+    'resume_session': (resume_session, True),
+    'stop_session': (stop_session, True),
+    'schedule': (handle_schedule_navigation, True),
+    'stats': (handle_stats_period, True),
+    'note': (handle_note_action, True),
+    'event': (handle_event_action, True),
+    'reminder': (handle_reminder_action, True),
+}
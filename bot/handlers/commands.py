@@ -1,39 +1,49 @@
 import logging
+import re
+from zoneinfo import available_timezones
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
 
+from handlers.message_handlers import accept_login_email
+
 logger = logging.getLogger(__name__)
 
+# IANA names loaded once - /timezone validates by membership instead of parsing tzdata
+_VALID_TZS = frozenset(available_timezones())
 
-def get_main_keyboard():
-    """Get the main command keyboard for authenticated users"""
-    keyboard = [
+# /start <email> skips the email prompt
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Account-bound user_data dropped on /logout; preferences like 'timezone' survive re-login
+_SENSITIVE_KEYS = frozenset({
+    'auth_token', 'gql_client', 'user_id', 'user_email', 'user_name', 'login_email',
+    'skill_cache', 'dl_cache', 'event_template', 'current_directory', 'awaiting',
+})
+
+# Static replies and keyboards are built once at import
+
+_MAIN_KEYBOARD = ReplyKeyboardMarkup(
+    [
         [KeyboardButton("/session"), KeyboardButton("/skills")],
         [KeyboardButton("/schedule"), KeyboardButton("/reminders")],
         [KeyboardButton("/notes"), KeyboardButton("/stats")],
         [KeyboardButton("/files"), KeyboardButton("/help")],
         [KeyboardButton("/logout")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, is_persistent=True)
-
+    ],
+    resize_keyboard=True,
+    is_persistent=True
+)
 
-def get_login_keyboard():
-    """Get a minimal keyboard for non-authenticated users"""
-    keyboard = [
+_LOGIN_KEYBOARD = ReplyKeyboardMarkup(
+    [
         [KeyboardButton("/start"), KeyboardButton("/help")]
-    ]
-    return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, is_persistent=True)
+    ],
+    resize_keyboard=True,
+    is_persistent=True
+)
 
-
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /start command"""
-    user = update.effective_user
-    telegram_id = user.id
-    
-    # Check if user is already logged in
-    if context.user_data.get('auth_token'):
-        welcome_message = f"""
-👋 Welcome back, {user.mention_html()}!
+_WELCOME_BACK_TMPL = """
+👋 Welcome back, {mention}!
 
 You're already connected to LifeTrack.
 
@@ -46,12 +56,9 @@ You're already connected to LifeTrack.
 • /logout - Disconnect your account
 • /help - Full command list
 """
-        await update.message.reply_html(welcome_message, reply_markup=get_main_keyboard())
-        return
-    
-    # Ask user to login
-    welcome_message = f"""
-👋 Hi {user.mention_html()}!
+
+_WELCOME_LOGIN_TMPL = """
+👋 Hi {mention}!
 
 Welcome to **LifeTrack Bot**! This bot allows you to:
 • Track your learning sessions
@@ -63,13 +70,8 @@ Send your email address to connect your account.
 
 Example: `user@example.com`
 """
-    await update.message.reply_html(welcome_message, reply_markup=get_login_keyboard())
-    context.user_data['awaiting_email'] = True
-
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /help command"""
-    help_text = """
+_HELP_TEXT = """
 📚 **LifeTrack Bot Commands**
 
 **🎮 Main Commands:**
@@ -127,7 +129,65 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 💡 **Tip:** Use /timezone to set your timezone for accurate reminder times!
 """
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+
+_STATS_MESSAGE = """
+📊 **Your Stats**
+
+**Today:**
+• Activities: 0
+• Time: 0 minutes
+• Notes: 0
+
+**This Week:**
+• Activities: 0
+• Time: 0 hours
+• Notes: 0
+
+**This Month:**
+•  Activities: 0
+• Time: 0 hours
+• Learning Plans: 0
+
+Use the web app for detailed analytics!
+"""
+
+
+def get_main_keyboard():
+    """Get the main command keyboard for authenticated users"""
+    return _MAIN_KEYBOARD
+
+
+def get_login_keyboard():
+    """Get a minimal keyboard for non-authenticated users"""
+    return _LOGIN_KEYBOARD
+
+
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /start command"""
+    user = update.effective_user
+    telegram_id = user.id
+    
+    # Check if user is already logged in
+    if context.user_data.get('auth_token'):
+        welcome_message = _WELCOME_BACK_TMPL.format(mention=user.mention_html())
+        await update.message.reply_html(welcome_message, reply_markup=_MAIN_KEYBOARD)
+        return
+    
+    # Email passed inline - go straight to the password step
+    args = context.args
+    if args and _EMAIL_RE.match(args[0]):
+        await accept_login_email(update, context, args[0])
+        return
+    
+    # Ask user to login
+    welcome_message = _WELCOME_LOGIN_TMPL.format(mention=user.mention_html())
+    await update.message.reply_html(welcome_message, reply_markup=_LOGIN_KEYBOARD)
+    context.user_data['awaiting'] = 'email'
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /help command"""
+    await update.message.reply_text(_HELP_TEXT, parse_mode='Markdown')
 
 
 async def logout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -138,19 +198,23 @@ async def logout(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     
     # Remove user from active users (for notifications)
     telegram_id = update.effective_user.id
-    active_users = context.bot_data.get('active_users', {})
-    if telegram_id in active_users:
-        del active_users[telegram_id]
-        logger.info(f"Removed user {telegram_id} from active users")
+    if context.bot_data['active_users'].pop(telegram_id, None) is not None:
+        logger.info("Removed user %s from active users", telegram_id)
     
-    # Clear user data
-    context.user_data.clear()
+    # Release the user's pooled backend connections
+    gql_client = context.user_data.get('gql_client')
+    if gql_client:
+        await gql_client.close()
+    
+    # Clear session data, keep preferences
+    for key in _SENSITIVE_KEYS:
+        context.user_data.pop(key, None)
     
     await update.message.reply_html(
         "👋 <b>Logged Out</b>\n\n"
         "You've been disconnected from your LifeTrack account.\n\n"
         "Use /start to login again.",
-        reply_markup=get_login_keyboard()
+        reply_markup=_LOGIN_KEYBOARD
     )
 
 
@@ -160,13 +224,13 @@ async def menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_html(
             "📝 <b>Command Menu</b>\n\n"
             "Use the buttons below to quickly access commands:",
-            reply_markup=get_main_keyboard()
+            reply_markup=_MAIN_KEYBOARD
         )
     else:
         await update.message.reply_html(
             "🔒 <b>Not Logged In</b>\n\n"
             "Please use /start to login first.",
-            reply_markup=get_login_keyboard()
+            reply_markup=_LOGIN_KEYBOARD
         )
 
 
@@ -200,48 +264,26 @@ async def timezone_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     # Set timezone
     tz_name = args[0]
-    try:
-        from zoneinfo import ZoneInfo
-        # Validate timezone
-        ZoneInfo(tz_name)
-        context.user_data['timezone'] = tz_name
-        
-        await update.message.reply_html(
-            f"✅ <b>Timezone Updated</b>\n\n"
-            f"Your timezone is now set to:\n"
-            f"<code>{tz_name}</code>\n\n"
-            f"This will be used for reminders and event times."
-        )
-    except Exception as e:
+    if tz_name not in _VALID_TZS:
         await update.message.reply_html(
             f"❌ <b>Invalid Timezone</b>\n\n"
             f"'{tz_name}' is not a valid timezone.\n\n"
             f"Use format like: <code>America/New_York</code>\n"
             f"Full list: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones"
         )
+        return
+    
+    context.user_data['timezone'] = tz_name
+    
+    await update.message.reply_html(
+        f"✅ <b>Timezone Updated</b>\n\n"
+        f"Your timezone is now set to:\n"
+        f"<code>{tz_name}</code>\n\n"
+        f"This will be used for reminders and event times."
+    )
 
 
 async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /stats command"""
     # TODO: Fetch real stats from backend
-    stats_message = """
-📊 **Your Stats**
-
-**Today:**
-• Activities: 0
-• Time: 0 minutes
-• Notes: 0
-
-**This Week:**
-• Activities: 0
-• Time: 0 hours
-• Notes: 0
-
-**This Month:**
-•  Activities: 0
-• Time: 0 hours
-• Learning Plans: 0
-
-Use the web app for detailed analytics!
-"""
-    await update.message.reply_text(stats_message, parse_mode='Markdown')
+    await update.message.reply_text(_STATS_MESSAGE, parse_mode='Markdown')
@@ -0,0 +1,12 @@
+"""
+Display constants shared by the handler modules
+"""
+
+# Event type -> emoji shown next to events in lists, details and reminders
+TYPE_EMOJI = {
+    'ACTIVITY': '✅',
+    'MEETING': '👥',
+    'LEARNING': '📚',
+    'REMINDER': '🔔',
+    'CUSTOM': '📌'
+}
@@ -4,11 +4,13 @@ File system handlers for Telegram bot
 Provides hybrid cloud/on-premises file storage through Telegram
 """
 
+import asyncio
+import itertools
 import logging
 import os
-import shutil
+import time
+from functools import lru_cache, wraps
 from pathlib import Path
-from datetime import datetime
 from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
@@ -16,21 +18,116 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Photos arrive without a name - the sequence keeps same-instant uploads distinct
+_photo_seq = itertools.count()
 
-async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle file uploads (documents and photos)"""
-    user = update.effective_user
+# Files listed in the download menu are kept this long, so a click needs no File query
+DOWNLOAD_CACHE_TTL = 300
+
+
+_ROOT_BUTTON = InlineKeyboardButton("🏠 Root", callback_data="files_list:/")
+
+
+@lru_cache(maxsize=512)
+def _nav_button(text: str, callback_data: str) -> InlineKeyboardButton:
+    """Directory navigation button - buttons are immutable, so one per (text, target) is reused"""
+    return InlineKeyboardButton(text, callback_data=callback_data)
+
+
+async def _notify(update: Update, message: str) -> None:
+    """Answer a button press, or reply to a command"""
+    if update.callback_query:
+        await update.callback_query.answer(message)
+    else:
+        await update.message.reply_text(message)
+
+
+def require_file_auth(func):
+    """
+    Decorator: check login and pass the user's GraphQL client to the handler.
     
-    # Check authentication
-    if not context.user_data.get('auth_token'):
-        await update.message.reply_text("🔒 Please login first using /start")
-        return
+    Unlike ui_commands.require_auth it also works for callback queries (replies
+    go through _notify), rejects sessions without a gql_client and calls the
+    handler as func(update, context, gql_client).
+    """
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        ud = context.user_data
+        if not ud.get('auth_token'):
+            await _notify(update, "🔒 Please login first using /start")
+            return
+        gql_client = ud.get('gql_client')
+        if not gql_client:
+            await _notify(update, "❌ Client not initialized. Please restart with /start")
+            return
+        return await func(update, context, gql_client)
+    return wrapper
+
+
+def _normalize_dir(directory: str) -> str:
+    """Normalize a logical directory: leading slash, no trailing slash except for root"""
+    if not directory or directory == '/':
+        return '/'
+    if directory[0] != '/':
+        directory = '/' + directory
+    return directory.rstrip('/') or '/'
+
+
+@lru_cache(maxsize=4096)
+def _fmt_size(num_bytes: int) -> str:
+    """Human-readable file size (cached - listings re-render the same sizes)"""
+    size_kb = num_bytes / 1024
+    return f"{size_kb:.1f}KB" if size_kb < 1024 else f"{size_kb / 1024:.1f}MB"
+
+
+def _split_ext(filename: str) -> tuple:
+    """Split 'name.ext' into ('name', '.ext') on the last dot, like Path.stem/suffix"""
+    stem, dot, ext = filename.rpartition('.')
+    if not stem:
+        # No dot, or a dotfile like '.env' - no extension
+        return filename, ''
+    return stem, dot + ext
+
+
+def _claim_storage_path(storage_root: Path, filename: str, unique_id: str) -> Path:
+    """Create an empty file under a free name and return its path.
     
-    # Get GraphQL client
-    gql_client = context.user_data.get('gql_client')
-    if not gql_client:
-        await update.message.reply_text("❌ Client not initialized. Please restart with /start")
-        return
+    Tries the original name, then name_<file_unique_id>, then adds a counter -
+    every candidate is claimed with O_EXCL so an existing file is never reused.
+    """
+    file_stem, file_ext = _split_ext(filename)
+    candidates = itertools.chain(
+        (filename, f"{file_stem}_{unique_id}{file_ext}"),
+        (f"{file_stem}_{unique_id}_{n}{file_ext}" for n in itertools.count(1)),
+    )
+    for candidate in candidates:
+        path = storage_root / candidate
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+            return path
+        except FileExistsError:
+            continue
+
+
+def _store_file(temp_path: Path, target_path: Path, data: bytes) -> None:
+    """Write a download to its .part file and rename it into place (blocking - run in a thread)"""
+    temp_path.write_bytes(data)
+    os.rename(temp_path, target_path)
+
+
+def _get_cached_download(context: ContextTypes.DEFAULT_TYPE, file_id: str) -> Optional[dict]:
+    """Get file info stored by the download menu if still fresh, else None"""
+    cache = context.user_data.get('dl_cache')
+    if cache and time.monotonic() - cache['t'] < DOWNLOAD_CACHE_TTL:
+        return cache['data'].get(file_id)
+    return None
+
+
+@require_file_auth
+async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client) -> None:
+    """Handle file uploads (documents and photos)"""
+    ud = context.user_data
+    user = update.effective_user
     
     # Determine file type and get file
     file = None
@@ -48,14 +145,14 @@ async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         file = await update.message.photo[-1].get_file()
         file_type = "photo"
         mime_type = "image/jpeg"
-        original_filename = f"photo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+        original_filename = f"photo_{time.time_ns()}_{next(_photo_seq)}.jpg"
     
     if not file:
         await update.message.reply_text("❌ No file detected")
         return
     
     # Get or prompt for directory
-    directory = context.user_data.get('current_directory', '/')
+    directory = ud.get('current_directory', '/')
     
     # Check if user specified directory in caption
     caption = update.message.caption
@@ -69,49 +166,26 @@ async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         directory = parts[0].strip()
         caption = parts[1].strip() if len(parts) > 1 else None
     
-    # Normalize directory path (no trailing slash except for root)
-    if not directory.startswith('/'):
-        directory = '/' + directory
-    # Remove trailing slash (except for root /)
-    if directory != '/' and directory.endswith('/'):
-        directory = directory.rstrip('/')
+    directory = _normalize_dir(directory)
     
     try:
-        # Download file to temporary location
-        temp_dir = Path(Config.FILE_TEMP_PATH)
-        temp_dir.mkdir(parents=True, exist_ok=True)
-        
         # Use original filename for physical storage (for transparency)
-        # If file exists, add timestamp to make it unique
+        # If it is taken, fall back to Telegram's unique file id to make it unique
         storage_root = Path(Config.FILE_STORAGE_PATH)
-        storage_root.mkdir(parents=True, exist_ok=True)
-        
-        # Get filename parts
-        file_stem = Path(original_filename).stem if original_filename else 'file'
-        file_ext = Path(original_filename).suffix if original_filename else ''
         
-        # Start with original filename
-        physical_filename = original_filename
-        target_file_path = storage_root / physical_filename
+        # Claim a free name atomically - only a path claimed here may be deleted on failure,
+        # anything else on disk may still back an older file record
+        target_file_path = _claim_storage_path(storage_root, original_filename or 'file', file.file_unique_id)
+        physical_filename = target_file_path.name
         
-        # If file exists, add timestamp to make unique
-        counter = 1
-        while target_file_path.exists():
-            # Check if it's the same file (by Telegram unique ID in database)
-            # If so, reuse it; otherwise create new file with timestamp
-            physical_filename = f"{file_stem}_{counter}{file_ext}"
-            target_file_path = storage_root / physical_filename
-            counter += 1
+        # Download next to the final path, then rename - same filesystem, so no copy.
+        # The Bot API returns the whole body in one buffer; write it off the event loop
+        temp_file_path = target_file_path.with_name(target_file_path.name + '.part')
+        data = await file.download_as_bytearray()
+        await asyncio.to_thread(_store_file, temp_file_path, target_file_path, data)
         
-        # Download to temp first
-        temp_file_path = temp_dir / physical_filename
-        await file.download_to_drive(temp_file_path)
-        
-        # Move to permanent storage
-        shutil.move(str(temp_file_path), str(target_file_path))
-        logger.info(f"File saved to storage: {target_file_path}")
-        
-        file_size = target_file_path.stat().st_size
+        # The downloaded buffer already has the exact size - no stat() on the new file
+        file_size = len(data)
         
         # Storage path is relative to storage root (for portability)
         storage_path = physical_filename
@@ -156,14 +230,10 @@ async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         created_file = result.get('createFile')
         
         if created_file:
-            # Format file size
-            size_kb = file_size / 1024
-            size_str = f"{size_kb:.1f} KB" if size_kb < 1024 else f"{size_kb/1024:.1f} MB"
-            
             response = f"✅ **File uploaded successfully!**\n\n"
             response += f"📁 Directory: `{directory}`\n"
             response += f"📄 Filename: `{original_filename}`\n"
-            response += f"💾 Size: {size_str}\n"
+            response += f"💾 Size: {_fmt_size(file_size)}\n"
             response += f"🆔 ID: `{created_file['id']}`"
             
             if caption:
@@ -171,8 +241,8 @@ async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             
             keyboard = [
                 [
-                    InlineKeyboardButton("📂 View Directory", callback_data=f"files_list:{directory}"),
-                    InlineKeyboardButton("🏠 Root", callback_data="files_list:/"),
+                    _nav_button("📂 View Directory", f"files_list:{directory}"),
+                    _ROOT_BUTTON,
                 ]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
@@ -181,52 +251,34 @@ async def upload_file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             
             logger.info(f"File uploaded and stored: {target_file_path} by user {user.id}")
         else:
-            # Clean up file if database creation failed
+            # Clean up the file we stored if database creation failed
             try:
-                if target_file_path.exists():
-                    target_file_path.unlink()
+                target_file_path.unlink(missing_ok=True)
             except Exception as cleanup_error:
-                logger.error(f"Failed to cleanup file: {cleanup_error}")
+                logger.warning("Failed to cleanup file: %s", cleanup_error)
             await update.message.reply_text("❌ Failed to create file record")
             
     except Exception as e:
-        logger.error(f"File upload error: {e}", exc_info=True)
+        logger.exception("File upload error: %s", e)
         # Try to cleanup temp file if it exists
         try:
-            if 'temp_file_path' in locals() and temp_file_path.exists():
-                temp_file_path.unlink()
-            if 'target_file_path' in locals() and target_file_path.exists():
-                target_file_path.unlink()
+            if 'temp_file_path' in locals():
+                temp_file_path.unlink(missing_ok=True)
+            # target_file_path is only bound once this handler has claimed (created) it
+            if 'target_file_path' in locals():
+                target_file_path.unlink(missing_ok=True)
         except Exception as cleanup_error:
-            logger.error(f"Failed to cleanup after error: {cleanup_error}")
+            logger.warning("Failed to cleanup after error: %s", cleanup_error)
         await update.message.reply_text(f"❌ Error uploading file: {str(e)}")
 
 
-async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+@require_file_auth
+async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client) -> None:
     """List files in current or specified directory"""
+    ud = context.user_data
     user = update.effective_user
     query = update.callback_query
     
-    # Check authentication
-    auth_token = context.user_data.get('auth_token')
-    if not auth_token:
-        message = "🔒 Please login first using /start"
-        if query:
-            await query.answer(message)
-        else:
-            await update.message.reply_text(message)
-        return
-    
-    # Get GraphQL client
-    gql_client = context.user_data.get('gql_client')
-    if not gql_client:
-        message = "❌ Client not initialized. Please restart with /start"
-        if query:
-            await query.answer(message)
-        else:
-            await update.message.reply_text(message)
-        return
-    
     # Determine directory
     directory = '/'
     if query and query.data.startswith('files_list:'):
@@ -235,14 +287,9 @@ async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     elif context.args:
         directory = ' '.join(context.args)
     else:
-        directory = context.user_data.get('current_directory', '/')
+        directory = ud.get('current_directory', '/')
     
-    # Normalize directory (no trailing slash except for root)
-    if not directory.startswith('/'):
-        directory = '/' + directory
-    # Remove trailing slash (except for root /)
-    if directory != '/' and directory.endswith('/'):
-        directory = directory.rstrip('/')
+    directory = _normalize_dir(directory)
     
     try:
         # Query files
@@ -281,47 +328,43 @@ async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         subdirs = dir_info.get('subdirectories', [])
         
         # Build response
-        response = f"📂 **Directory:** `{directory}`\n"
-        response += f"📊 Files: {total_count}\n\n"
+        parts = [f"📂 **Directory:** `{directory}`\n", f"📊 Files: {total_count}\n\n"]
         
         # Show subdirectories
         if subdirs:
-            response += "**📁 Subdirectories:**\n"
-            for subdir in subdirs[:10]:
-                response += f"  └─ `{subdir}`\n"
+            parts.append("**📁 Subdirectories:**\n")
+            parts.extend(f"  └─ `{subdir}`\n" for subdir in subdirs[:10])
             if len(subdirs) > 10:
-                response += f"  ... and {len(subdirs) - 10} more\n"
-            response += "\n"
+                parts.append(f"  ... and {len(subdirs) - 10} more\n")
+            parts.append("\n")
         
         # Show files
         if files:
-            response += "**📄 Files:**\n"
+            parts.append("**📄 Files:**\n")
             for file in files[:10]:
-                size_kb = file['fileSize'] / 1024
-                size_str = f"{size_kb:.1f}KB" if size_kb < 1024 else f"{size_kb/1024:.1f}MB"
-                
                 # Truncate filename if too long
                 filename = file['originalFilename']
                 if len(filename) > 30:
                     filename = filename[:27] + "..."
                 
-                response += f"  • `{filename}` ({size_str})\n"
+                parts.append(f"  • `{filename}` ({_fmt_size(file['fileSize'])})\n")
             
             if total_count > 10:
-                response += f"  ... and {total_count - 10} more files\n"
+                parts.append(f"  ... and {total_count - 10} more files\n")
         else:
-            response += "_No files in this directory_\n"
+            parts.append("_No files in this directory_\n")
+        
+        response = ''.join(parts)
         
         # Create navigation keyboard
         keyboard = []
         
         # Parent directory button
         if directory != '/':
-            parent = str(Path(directory).parent)
-            if parent == '.':
-                parent = '/'
+            # directory is normalized ('/a/b'), so the parent is everything before the last '/'
+            parent = directory.rsplit('/', 1)[0] or '/'
             keyboard.append([
-                InlineKeyboardButton("⬆️ Parent Directory", callback_data=f"files_list:{parent}")
+                _nav_button("⬆️ Parent Directory", f"files_list:{parent}")
             ])
         
         # Subdirectory buttons
@@ -330,23 +373,23 @@ async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 # Build subdirectory path (no trailing slash)
                 subdir_path = f"{directory}/{subdir}" if directory != '/' else f"/{subdir}"
                 keyboard.append([
-                    InlineKeyboardButton(f"📁 {subdir}", callback_data=f"files_list:{subdir_path}")
+                    _nav_button(f"📁 {subdir}", f"files_list:{subdir_path}")
                 ])
         
         # Action buttons
         action_row = []
         if files:
-            action_row.append(InlineKeyboardButton("📥 Download", callback_data=f"files_download_menu:{directory}"))
-        action_row.append(InlineKeyboardButton("🔄 Refresh", callback_data=f"files_list:{directory}"))
+            action_row.append(_nav_button("📥 Download", f"files_download_menu:{directory}"))
+        action_row.append(_nav_button("🔄 Refresh", f"files_list:{directory}"))
         if action_row:
             keyboard.append(action_row)
         
-        keyboard.append([InlineKeyboardButton("🏠 Root", callback_data="files_list:/")])
+        keyboard.append([_ROOT_BUTTON])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         # Store current directory
-        context.user_data['current_directory'] = directory
+        ud['current_directory'] = directory
         
         # Send or edit message
         if query:
@@ -355,7 +398,7 @@ async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await update.message.reply_text(response, reply_markup=reply_markup, parse_mode='Markdown')
             
     except Exception as e:
-        logger.error(f"List files error: {e}", exc_info=True)
+        logger.exception("List files error: %s", e)
         error_msg = f"❌ Error listing files: {str(e)}"
         if query:
             await query.answer(error_msg)
@@ -363,31 +406,30 @@ async def list_files_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             await update.message.reply_text(error_msg)
 
 
-async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+@require_file_auth
+async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TYPE, gql_client) -> None:
     """Download a file by ID or from a menu"""
+    ud = context.user_data
     query = update.callback_query
     
-    if not context.user_data.get('auth_token'):
-        await query.answer("🔒 Please login first using /start")
-        return
-    
-    gql_client = context.user_data.get('gql_client')
-    if not gql_client:
-        await query.answer("❌ Client not initialized")
-        return
-    
     try:
         if query.data.startswith('files_download_menu:'):
             # Show download menu for directory
             directory = query.data.split(':', 1)[1]
             
+            # Select everything the download branch needs so a click skips the File query
             query_str = """
             query Files($filter: FileFilter, $limit: Int) {
                 files(filter: $filter, limit: $limit) {
                     nodes {
                         id
                         originalFilename
+                        directory
+                        mimeType
                         fileSize
+                        telegramFileId
+                        storagePath
+                        description
                     }
                 }
             }
@@ -405,6 +447,8 @@ async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TY
                 await query.answer("No files to download")
                 return
             
+            ud['dl_cache'] = {'t': time.monotonic(), 'data': {f['id']: f for f in files}}
+            
             keyboard = []
             for file in files:
                 filename = file['originalFilename']
@@ -418,7 +462,7 @@ async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TY
                 ])
             
             keyboard.append([
-                InlineKeyboardButton("⬅️ Back", callback_data=f"files_list:{directory}")
+                _nav_button("⬅️ Back", f"files_list:{directory}")
             ])
             
             await query.edit_message_text(
@@ -431,28 +475,42 @@ async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TY
         elif query.data.startswith('files_download:'):
             # Download specific file
             file_id = query.data.split(':', 1)[1]
-            await query.answer("⏳ Preparing download...")
             
-            # Get file info
-            query_str = """
-            query File($id: UUID!) {
-                file(id: $id) {
-                    id
-                    originalFilename
-                    directory
-                    mimeType
-                    fileSize
-                    telegramFileId
-                    storagePath
-                    description
+            # Get file info (from the menu listing when fresh)
+            file = _get_cached_download(context, file_id)
+            meta_task = None
+            if file is None:
+                query_str = """
+                query File($id: UUID!) {
+                    file(id: $id) {
+                        id
+                        originalFilename
+                        directory
+                        mimeType
+                        fileSize
+                        telegramFileId
+                        storagePath
+                        description
+                    }
                 }
-            }
-            """
+                """
+                # Start the lookup now so it overlaps the answer round trip to Telegram
+                meta_task = asyncio.create_task(gql_client.execute(query_str, {"id": file_id}))
             
-            result = await gql_client.execute(query_str, {"id": file_id})
-            file = result.get('file')
+            try:
+                await query.answer("⏳ Preparing download...")
+            except BaseException:
+                # Don't leave the lookup running unobserved when the answer fails
+                if meta_task:
+                    meta_task.cancel()
+                raise
+            
+            if meta_task:
+                result = await meta_task
+                file = result.get('file')
             
             if not file:
+                logger.warning("File not found: %s", file_id)
                 await query.message.reply_text("❌ File not found")
                 return
             
@@ -488,6 +546,7 @@ async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TY
                 file_path = Path(Config.FILE_STORAGE_PATH) / storage_path
                 
                 if not file_path.exists():
+                    logger.warning("File %s missing from storage: %s", file_id, file_path)
                     await query.message.reply_text(
                         f"❌ File not found on disk: {storage_path}\n\n"
                         "The file may have been moved or deleted."
@@ -528,16 +587,19 @@ async def download_file_command(update: Update, context: ContextTypes.DEFAULT_TY
                         }
                     )
                     
+                    # Later clicks from the same menu can now reuse the Telegram copy
+                    file['telegramFileId'] = new_telegram_file_id
+                    
                     logger.info(f"File uploaded to Telegram and cached: {file['id']} by user {update.effective_user.id}")
                     
                 except Exception as upload_error:
-                    logger.error(f"Error uploading file to Telegram: {upload_error}", exc_info=True)
+                    logger.exception("Error uploading file to Telegram: %s", upload_error)
                     await query.message.reply_text(
                         f"❌ Error uploading file: {str(upload_error)}"
                     )
                 
     except Exception as e:
-        logger.error(f"Download file error: {e}", exc_info=True)
+        logger.exception("Download file error: %s", e)
         await query.answer(f"❌ Error: {str(e)}")
 
 
@@ -554,12 +616,14 @@ async def files_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 async def set_directory_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Set current directory for file uploads"""
-    if not context.user_data.get('auth_token'):
+    ud = context.user_data
+    
+    if not ud.get('auth_token'):
         await update.message.reply_text("🔒 Please login first using /start")
         return
     
     if not context.args:
-        current_dir = context.user_data.get('current_directory', '/')
+        current_dir = ud.get('current_directory', '/')
         await update.message.reply_text(
             f"📂 **Current upload directory:** `{current_dir}`\n\n"
             f"Usage: `/cd /path/to/directory`\n"
@@ -570,16 +634,9 @@ async def set_directory_command(update: Update, context: ContextTypes.DEFAULT_TY
         )
         return
     
-    directory = ' '.join(context.args)
-    
-    # Normalize path (no trailing slash except for root)
-    if not directory.startswith('/'):
-        directory = '/' + directory
-    # Remove trailing slash (except for root /)
-    if directory != '/' and directory.endswith('/'):
-        directory = directory.rstrip('/')
+    directory = _normalize_dir(' '.join(context.args))
     
-    context.user_data['current_directory'] = directory
+    ud['current_directory'] = directory
     
     await update.message.reply_text(
         f"✅ **Upload directory changed to:** `{directory}`\n\n"
@@ -1,73 +1,247 @@
 import logging
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple
+from zoneinfo import ZoneInfo
 from telegram import Update
 from telegram.ext import ContextTypes
+from gql import gql
+
+from handlers.constants import TYPE_EMOJI
 
 logger = logging.getLogger(__name__)
 
+# Base (unauthenticated) client, set once at startup by init()
+_gql_client = None
+
+# Keys written during login - dropped again when it fails
+_LOGIN_KEYS = ('login_email', 'awaiting', 'auth_token', 'user_id', 'user_email', 'user_name', 'gql_client')
+
+# Use the linear-time RE2 engine for scanning user text when google-re2 is installed.
+# RE2's \w is ASCII-only, so letters and digits are spelled out to match Python's \w.
+try:
+    import re2
+    _TAG_RE = re2.compile(r'#([\pL\pN_]+)')
+except ImportError:
+    _TAG_RE = re.compile(r'#(\w+)')
+
+# Reminder metadata lines
+_DUE_RE = re.compile(r'Due:\s*(.+)', re.IGNORECASE)
+_PRIORITY_RE = re.compile(r'Priority:\s*(\w+)', re.IGNORECASE)
+
+_DUE_FORMATS = ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d %H:%M')
+
+# Characters legacy Markdown treats as entity markers
+_MD_ESCAPE = str.maketrans({'*': r'\*', '_': r'\_', '`': r'\`', '[': r'\['})
+
+# Event start formats: YYYY-MM-DD HH:MM is matched directly, other ISO forms go
+# through datetime.fromisoformat and only these remaining formats use strptime
+_DT_FORMATS = ('%m/%d/%Y %H:%M',)
+_FAST_DT_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2}) (\d{2}):(\d{2})$')
+
+# Sent without parse_mode - plain text needs no server-side parsing
+_QUICK_COMMANDS_TEXT = (
+    "💡 Quick Commands:\n\n"
+    "• /session - Manage learning sessions\n"
+    "• /schedule - View calendar & create events\n"
+    "• /reminders - Manage reminders\n"
+    "• /notes - View & create notes\n"
+    "• /stats - Check your progress\n\n"
+    "Use buttons in these commands for quick actions!"
+)
+
+_INVALID_NOTE_TEXT = (
+    "❌ **Invalid Note Format**\n\n"
+    "Please provide at least a title and content.\n\n"
+    "Example:\n"
+    "`Meeting Notes\nDiscussed project timeline\n#work #meeting`"
+)
+
+_INVALID_EVENT_TEXT = (
+    "❌ **Invalid Event Format**\n\n"
+    "Please provide:\n"
+    "1. Title\n"
+    "2. Date & Time (YYYY-MM-DD HH:MM)\n"
+    "3. Duration (minutes)\n"
+    "4. Type (optional: LEARNING/MEETING/REMINDER/CUSTOM)\n\n"
+    "Example:\n"
+    "`Team Meeting\n2026-02-13 14:00\n60\nMEETING`"
+)
+
+_INVALID_DT_TEXT = (
+    "❌ **Invalid Date/Time or Duration**\n\n"
+    "Use format: YYYY-MM-DD HH:MM\n"
+    "Duration in minutes (e.g., 60)\n\n"
+    "Example: `2026-02-13 14:00` and `60`"
+)
+
+_MISSING_DUE_TEXT = (
+    "❌ **Invalid Format**\n\n"
+    "Please include a due date/time:\n"
+    "`Due: 2026-02-20 14:30`"
+)
+
+_CREATE_NOTE_MUT = gql("""
+mutation CreateNote($input: CreateNoteInput!) {
+    createNote(input: $input) {
+        id
+        title
+        tags
+    }
+}
+""")
+
+# searchNotes takes no limit (the server caps results at 50), so only the fields the
+# result list shows are requested - note bodies are never sent over the wire
+_SEARCH_NOTES_Q = gql("""
+query SearchNotes($query: String!) {
+    searchNotes(query: $query) {
+        id
+        title
+        tags
+    }
+}
+""")
+
+# Shared by free-text event creation and the template flow
+_CREATE_EVENT_MUT = gql("""
+mutation CreateEvent($input: CreateEventInput!) {
+    createEvent(input: $input) {
+        id
+        title
+        startTime
+        type
+    }
+}
+""")
+
+_CREATE_REMINDER_MUT = gql("""
+mutation CreateReminder($input: CreateReminderInput!) {
+    createReminder(input: $input) {
+        id
+        title
+        dueTime
+        priority
+    }
+}
+""")
+
+
+def _send_async(context: ContextTypes.DEFAULT_TYPE, message, text: str, **kwargs) -> None:
+    """Send a terminal reply without waiting on Telegram - nothing after it depends on the send.
+    
+    The application tracks the task: it is awaited on shutdown and failures reach the error handlers.
+    """
+    context.application.create_task(message.reply_text(text, **kwargs))
+
+
+class EventTemplate(NamedTuple):
+    """Pending event from a template, kept in user_data until the title is confirmed"""
+    title: str
+    type: str
+    start_time: str  # ISO format
+    end_time: str
+
+
+def _md_escape(text: str) -> str:
+    """Escape user text for legacy Markdown so titles with * or _ don't break the reply"""
+    return text.translate(_MD_ESCAPE)
+
+
+@lru_cache(maxsize=64)
+def _get_tz(name: str) -> ZoneInfo:
+    """User timezone by name (cached - most users share a handful of zones)"""
+    return ZoneInfo(name)
+
+
+def init(gql_client) -> None:
+    """Register the process-wide base GraphQL client used for logins"""
+    global _gql_client
+    _gql_client = gql_client
+
+
+def _drop_login_state(user_data: dict) -> None:
+    """Forget a failed login without clearing preferences such as 'timezone'"""
+    for key in _LOGIN_KEYS:
+        user_data.pop(key, None)
+
+
+def _extract_tags(text: str) -> tuple:
+    """Collect #tags and strip them from the text in a single regex pass"""
+    tags = []
+    
+    def _take(match):
+        tags.append(match.group(1))
+        return ''
+    
+    return tags, _TAG_RE.sub(_take, text)
+
+
+def _parse_event_start(text: str) -> datetime:
+    """Parse an event start time as naive UTC, cheapest format first"""
+    match = _FAST_DT_RE.match(text)
+    if match:
+        return datetime(*map(int, match.groups()))
+    
+    try:
+        start_time = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in _DT_FORMATS:
+            try:
+                return datetime.strptime(text, fmt)
+            except ValueError:
+                continue
+        raise ValueError("Invalid date format")
+    
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return start_time
+
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle text messages for creating notes, events, etc.
     """
-    # Check if we're awaiting specific input
+    # Edited messages and non-text updates carry no text to act on
+    message = update.message
+    if message is None or message.text is None:
+        return
+    
+    # Check if we're awaiting specific input - one 'awaiting' key names the pending step
     user_data = context.user_data
+    awaiting = user_data.get('awaiting')
     
     # Handle login flow FIRST (before checking for gql_client)
-    if user_data.get('awaiting_email'):
+    if awaiting == 'email':
         await process_email(update, context)
         return
     
-    if user_data.get('awaiting_password'):
-        # For password, we need the base gql_client from bot_data
-        base_client = context.bot_data.get('gql_client')
+    if awaiting == 'password':
+        # For password, we need the base gql_client (registered at startup)
+        base_client = _gql_client or context.bot_data.get('gql_client')
         if not base_client:
-            await update.message.reply_text("❌ Bot not initialized properly.")
+            _send_async(context, message, "❌ Bot not initialized properly.")
             return
         await process_password(update, context, base_client)
         return
     
     # Now check for authenticated client for all other operations
-    gql_client = context.user_data.get('gql_client')
+    gql_client = user_data.get('gql_client')
     
     if not gql_client:
-        await update.message.reply_text(
-            "🔒 Please login first using /start"
-        )
+        _send_async(context, message, "🔒 Please login first using /start")
         return
     
-    if user_data.get('awaiting_note'):
-        await create_note_from_message(update, context)
-        user_data['awaiting_note'] = False
-        
-    elif user_data.get('awaiting_note_search'):
-        await search_notes(update, context)
-        user_data['awaiting_note_search'] = False
-        
-    elif user_data.get('awaiting_event'):
-        await create_event_from_message(update, context)
-        user_data['awaiting_event'] = False
-        
-    elif user_data.get('awaiting_event_title'):
-        await finalize_event_from_template(update, context)
-        user_data['awaiting_event_title'] = False
-        
-    elif user_data.get('awaiting_reminder'):
-        await create_reminder_from_message(update, context)
-        user_data['awaiting_reminder'] = False
-        
+    # Pending input is consumed by the message that answers it
+    if awaiting:
+        handler = _AWAITING_DISPATCH.get(user_data.pop('awaiting'))
+        if handler:
+            await handler(update, context)
+            return
+    
     # Otherwise, provide helpful response
-    else:
-        await update.message.reply_text(
-            "💡 **Quick Commands:**\n\n"
-            "• /session - Manage learning sessions\n"
-            "• /schedule - View calendar & create events\n"
-            "• /reminders - Manage reminders\n"
-            "• /notes - View & create notes\n"
-            "• /stats - Check your progress\n\n"
-            "Use buttons in these commands for quick actions!"
-        )
+    _send_async(context, message, _QUICK_COMMANDS_TEXT)
 
 
 async def process_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -81,10 +255,13 @@ async def process_email(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         )
         return
     
-    # Store email and ask for password
+    await accept_login_email(update, context, email)
+
+
+async def accept_login_email(update: Update, context: ContextTypes.DEFAULT_TYPE, email: str) -> None:
+    """Store a validated login email and ask for the password"""
     context.user_data['login_email'] = email
-    context.user_data['awaiting_email'] = False
-    context.user_data['awaiting_password'] = True
+    context.user_data['awaiting'] = 'password'
     
     await update.message.reply_text(
         "🔐 Now send your password.\n\n"
@@ -106,10 +283,11 @@ async def process_password(update: Update, context: ContextTypes.DEFAULT_TYPE, g
     
     if not email:
         await update.message.reply_text("❌ Error: Email not found. Please run /start again.")
-        context.user_data.clear()
+        _drop_login_state(context.user_data)
         return
     
     # Attempt login
+    login_client = None
     try:
         from backend_client.simple_client import GraphQLClient
         
@@ -125,10 +303,10 @@ async def process_password(update: Update, context: ContextTypes.DEFAULT_TYPE, g
         
         # Clean up login state
         context.user_data.pop('login_email', None)
-        context.user_data.pop('awaiting_password', None)
+        context.user_data.pop('awaiting', None)
         
-        # Create authenticated client for this user
-        user_client = GraphQLClient(gql_client.url, auth_payload['token'], gql_client.timeout)
+        # The login client now carries the user's token - keep it as their authenticated client
+        user_client = login_client
         context.user_data['gql_client'] = user_client
         
         # Add user to active users for notification tracking
@@ -139,7 +317,7 @@ async def process_password(update: Update, context: ContextTypes.DEFAULT_TYPE, g
             'user_id': auth_payload['user']['id'],
             'name': auth_payload['user'].get('name', 'User')
         }
-        logger.info(f"Added user {telegram_id} to active users for notifications")
+        logger.info("Added user %s to active users for notifications", telegram_id)
         
         # Import keyboard function
         from handlers.commands import get_main_keyboard
@@ -155,8 +333,12 @@ async def process_password(update: Update, context: ContextTypes.DEFAULT_TYPE, g
         )
         
     except Exception as e:
-        logger.error(f"Login failed: {e}")
-        context.user_data.clear()
+        logger.warning("Login failed: %s", e)
+        # The login client holds an open session - close it and forget any partial login
+        if login_client is not None:
+            context.bot_data.get('active_users', {}).pop(update.effective_user.id, None)
+            await login_client.close()
+        _drop_login_state(context.user_data)
         await update.effective_chat.send_message(
             f"❌ <b>Login Failed</b>\n\n"
             f"{str(e)}\n\n"
@@ -169,51 +351,30 @@ async def create_note_from_message(update: Update, context: ContextTypes.DEFAULT
     """
     Create a note from user message
     """
-    message_text = update.message.text
+    message_text = update.message.text.strip()
     gql_client = context.user_data.get('gql_client')
     
-    # Parse the message
-    lines = message_text.strip().split('\n')
-    
-    # Extract tags (words starting with #)
-    tags = re.findall(r'#(\w+)', message_text)
+    # Extract tags (words starting with #) and remove them from the text.
+    # Tags never span a newline, so the cleaned text keeps the same first line break.
+    tags, clean_text = _extract_tags(message_text)
+    newline = message_text.find('\n')
     
-    # Remove tags from text
-    clean_text = re.sub(r'#\w+', '', message_text).strip()
-    
-    if len(lines) >= 2:
-        # Multi-line: first line is title, rest is content
-        title = lines[0].strip()
-        content = '\n'.join(lines[1:]).strip()
-        # Remove tags from content
-        content = re.sub(r'#\w+', '', content).strip()
+    if newline >= 0:
+        # Multi-line: first line is title, rest is content (without tags)
+        title = message_text[:newline].strip()
+        content = clean_text[clean_text.find('\n') + 1:].strip()
     else:
         # Single line: use as both title and content
+        clean_text = clean_text.strip()
         title = clean_text[:50]  # First 50 chars as title
         content = clean_text
     
     if not title or not content:
-        await update.message.reply_text(
-            "❌ **Invalid Note Format**\n\n"
-            "Please provide at least a title and content.\n\n"
-            "Example:\n"
-            "`Meeting Notes\nDiscussed project timeline\n#work #meeting`",
-            parse_mode='Markdown'
-        )
+        _send_async(context, update.message, _INVALID_NOTE_TEXT, parse_mode='Markdown')
         return
     
-    mutation = """
-    mutation CreateNote($input: CreateNoteInput!) {
-        createNote(input: $input) {
-            id
-            title
-            tags
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(mutation, {
+        result = await gql_client.execute(_CREATE_NOTE_MUT, {
             'input': {
                 'title': title,
                 'content': content,
@@ -224,20 +385,20 @@ async def create_note_from_message(update: Update, context: ContextTypes.DEFAULT
         note = result.get('createNote')
         
         if note:
-            tags_str = ' '.join(f'#{tag}' for tag in tags) if tags else ''
+            tags_str = _md_escape('#' + ' #'.join(tags)) if tags else ''
             await update.message.reply_text(
                 f"✅ **Note Created!**\n\n"
-                f"📝 {note['title']}\n"
+                f"📝 {_md_escape(note['title'])}\n"
                 f"{tags_str}\n\n"
                 "Use /notes to view all your notes.",
                 parse_mode='Markdown'
             )
         else:
-            await update.message.reply_text("❌ Failed to create note.")
+            _send_async(context, update.message, "❌ Failed to create note.")
             
     except Exception as e:
-        logger.error(f"Error creating note: {e}", exc_info=True)
-        await update.message.reply_text("❌ Error creating note. Please try again.")
+        logger.exception("Error creating note: %s", e)
+        _send_async(context, update.message, "❌ Error creating note. Please try again.")
 
 
 async def search_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -247,24 +408,15 @@ async def search_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     query_text = update.message.text
     gql_client = context.user_data.get('gql_client')
     
-    search_query = """
-    query SearchNotes($query: String!) {
-        searchNotes(query: $query) {
-            id
-            title
-            content
-            tags
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(search_query, {'query': query_text})
+        result = await gql_client.execute(_SEARCH_NOTES_Q, {'query': query_text})
         notes = result.get('searchNotes', [])
         
         if not notes:
+            # A backtick would close the code span early
+            query_shown = query_text.replace('`', "'")
             await update.message.reply_text(
-                f"🔍 **No results found for:** `{query_text}`\n\n"
+                f"🔍 **No results found for:** `{query_shown}`\n\n"
                 "Try different keywords.",
                 parse_mode='Markdown'
             )
@@ -273,9 +425,9 @@ async def search_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         message = f"🔍 **Search Results** ({len(notes)} found)\n\n"
         
         for i, note in enumerate(notes[:5], 1):
-            title = note['title']
+            title = _md_escape(note['title'])
             tags = note.get('tags', [])
-            tags_str = ' '.join(f'#{tag}' for tag in tags[:2]) if tags else ''
+            tags_str = _md_escape('#' + ' #'.join(tags[:2])) if tags else ''
             
             message += f"{i}. **{title}**"
             if tags_str:
@@ -290,8 +442,8 @@ async def search_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await update.message.reply_text(message, parse_mode='Markdown')
         
     except Exception as e:
-        logger.error(f"Error searching notes: {e}", exc_info=True)
-        await update.message.reply_text("❌ Error searching notes.")
+        logger.exception("Error searching notes: %s", e)
+        _send_async(context, update.message, "❌ Error searching notes.")
 
 
 async def create_event_from_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -301,20 +453,11 @@ async def create_event_from_message(update: Update, context: ContextTypes.DEFAUL
     message_text = update.message.text
     gql_client = context.user_data.get('gql_client')
     
-    lines = message_text.strip().split('\n')
+    # Only the first four lines are used, so stop splitting after them
+    lines = message_text.strip().split('\n', 4)
     
     if len(lines) < 3:
-        await update.message.reply_text(
-            "❌ **Invalid Event Format**\n\n"
-            "Please provide:\n"
-            "1. Title\n"
-            "2. Date & Time (YYYY-MM-DD HH:MM)\n"
-            "3. Duration (minutes)\n"
-            "4. Type (optional: LEARNING/MEETING/REMINDER/CUSTOM)\n\n"
-            "Example:\n"
-            "`Team Meeting\n2026-02-13 14:00\n60\nMEETING`",
-            parse_mode='Markdown'
-        )
+        _send_async(context, update.message, _INVALID_EVENT_TEXT, parse_mode='Markdown')
         return
     
     title = lines[0].strip()
@@ -322,56 +465,30 @@ async def create_event_from_message(update: Update, context: ContextTypes.DEFAUL
     duration_str = lines[2].strip()
     event_type = lines[3].strip().upper() if len(lines) > 3 else 'CUSTOM'
     
-    # Validate event type
-    valid_types = ['ACTIVITY', 'LEARNING', 'MEETING', 'REMINDER', 'CUSTOM']
-    if event_type not in valid_types:
+    # Validate event type (the emoji map doubles as the set of valid types)
+    if event_type not in TYPE_EMOJI:
         event_type = 'CUSTOM'
     
     # Parse date and time
     try:
-        # Try different date formats
-        for fmt in ['%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M']:
-            try:
-                start_time = datetime.strptime(date_time_str, fmt)
-                break
-            except ValueError:
-                continue
-        else:
-            raise ValueError("Invalid date format")
+        start_time = _parse_event_start(date_time_str)
         
         # Parse duration
         duration = int(duration_str)
         end_time = start_time + timedelta(minutes=duration)
         
     except Exception as e:
-        logger.error(f"Error parsing event data: {e}")
-        await update.message.reply_text(
-            "❌ **Invalid Date/Time or Duration**\n\n"
-            "Use format: YYYY-MM-DD HH:MM\n"
-            "Duration in minutes (e.g., 60)\n\n"
-            "Example: `2026-02-13 14:00` and `60`",
-            parse_mode='Markdown'
-        )
+        logger.warning("Error parsing event data: %s", e)
+        _send_async(context, update.message, _INVALID_DT_TEXT, parse_mode='Markdown')
         return
     
-    mutation = """
-    mutation CreateEvent($input: CreateEventInput!) {
-        createEvent(input: $input) {
-            id
-            title
-            startTime
-            type
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(mutation, {
+        result = await gql_client.execute(_CREATE_EVENT_MUT, {
             'input': {
                 'title': title,
                 'type': event_type,
-                'startTime': start_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
-                'endTime': end_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'startTime': start_time.isoformat(timespec='seconds') + 'Z',
+                'endTime': end_time.isoformat(timespec='seconds') + 'Z',
                 'allDay': False
             }
         })
@@ -379,28 +496,22 @@ async def create_event_from_message(update: Update, context: ContextTypes.DEFAUL
         event = result.get('createEvent')
         
         if event:
-            type_emoji = {
-                'ACTIVITY': '✅',
-                'MEETING': '👥',
-                'LEARNING': '📚',
-                'REMINDER': '🔔',
-                'CUSTOM': '📌'
-            }.get(event_type, '📌')
+            type_emoji = TYPE_EMOJI[event_type]
             
             await update.message.reply_text(
                 f"✅ **Event Created!**\n\n"
-                f"{type_emoji} {event['title']}\n"
+                f"{type_emoji} {_md_escape(event['title'])}\n"
                 f"📅 {start_time.strftime('%A, %B %d at %I:%M %p')}\n"
                 f"⏱️ Duration: {duration} minutes\n\n"
                 "Use /schedule to view your calendar.",
                 parse_mode='Markdown'
             )
         else:
-            await update.message.reply_text("❌ Failed to create event.")
+            _send_async(context, update.message, "❌ Failed to create event.")
             
     except Exception as e:
-        logger.error(f"Error creating event: {e}", exc_info=True)
-        await update.message.reply_text("❌ Error creating event. Please try again.")
+        logger.exception("Error creating event: %s", e)
+        _send_async(context, update.message, "❌ Error creating event. Please try again.")
 
 
 async def finalize_event_from_template(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -410,34 +521,23 @@ async def finalize_event_from_template(update: Update, context: ContextTypes.DEF
     message_text = update.message.text.strip()
     gql_client = context.user_data.get('gql_client')
     
-    template = context.user_data.get('event_template', {})
+    template = context.user_data.get('event_template')
     
     if not template:
-        await update.message.reply_text("❌ Template expired. Please start again.")
+        _send_async(context, update.message, "❌ Template expired. Please start again.")
         return
     
     # Use custom title or confirm with default
     if message_text.lower() != 'confirm':
-        template['title'] = message_text
-    
-    mutation = """
-    mutation CreateEvent($input: CreateEventInput!) {
-        createEvent(input: $input) {
-            id
-            title
-            startTime
-            type
-        }
-    }
-    """
+        template = template._replace(title=message_text)
     
     try:
-        result = await gql_client.execute(mutation, {
+        result = await gql_client.execute(_CREATE_EVENT_MUT, {
             'input': {
-                'title': template['title'],
-                'type': template['type'],
-                'startTime': template['start_time'],
-                'endTime': template['end_time'],
+                'title': template.title,
+                'type': template.type,
+                'startTime': template.start_time,
+                'endTime': template.end_time,
                 'allDay': False
             }
         })
@@ -445,32 +545,26 @@ async def finalize_event_from_template(update: Update, context: ContextTypes.DEF
         event = result.get('createEvent')
         
         if event:
-            type_emoji = {
-                'ACTIVITY': '✅',
-                'MEETING': '👥',
-                'LEARNING': '📚',
-                'REMINDER': '🔔',
-                'CUSTOM': '📌'
-            }.get(template['type'], '📌')
+            type_emoji = TYPE_EMOJI.get(template.type, '📌')
             
-            start_dt = datetime.fromisoformat(template['start_time'])
+            start_dt = datetime.fromisoformat(template.start_time)
             
             await update.message.reply_text(
                 f"✅ **Event Created!**\n\n"
-                f"{type_emoji} {event['title']}\n"
+                f"{type_emoji} {_md_escape(event['title'])}\n"
                 f"📅 {start_dt.strftime('%A, %B %d at %I:%M %p')}\n\n"
                 "Use /schedule to view your calendar.",
                 parse_mode='Markdown'
             )
         else:
-            await update.message.reply_text("❌ Failed to create event.")
+            _send_async(context, update.message, "❌ Failed to create event.")
             
         # Clear template
         context.user_data.pop('event_template', None)
         
     except Exception as e:
-        logger.error(f"Error finalizing event: {e}", exc_info=True)
-        await update.message.reply_text("❌ Error creating event. Please try again.")
+        logger.exception("Error finalizing event: %s", e)
+        _send_async(context, update.message, "❌ Error creating event. Please try again.")
 
 async def create_reminder_from_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -485,10 +579,6 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
     gql_client = context.user_data.get('gql_client')
     
     try:
-        import re
-        from datetime import datetime
-        from zoneinfo import ZoneInfo
-        
         # Get user's timezone or default to UTC
         # TODO: Store user timezone preference in user_data
         user_timezone = context.user_data.get('timezone', 'UTC')
@@ -507,17 +597,17 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
             line = line.strip()
             
             # Check for Due time
-            due_match = re.match(r'Due:\s*(.+)', line, re.IGNORECASE)
+            due_match = _DUE_RE.match(line)
             if due_match:
                 due_str = due_match.group(1).strip()
                 try:
                     # Try parsing various date formats
-                    for fmt in ['%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y %H:%M', '%m/%d %H:%M']:
+                    for fmt in _DUE_FORMATS:
                         try:
                             due_time = datetime.strptime(due_str, fmt)
                             # Localize to user's timezone (assume input is in their local time)
                             try:
-                                tz = ZoneInfo(user_timezone)
+                                tz = _get_tz(user_timezone)
                                 due_time = due_time.replace(tzinfo=tz)
                             except Exception:
                                 # Fallback: treat as naive datetime, backend will handle
@@ -534,7 +624,7 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
                 continue
             
             # Check for priority
-            priority_match = re.match(r'Priority:\s*(\w+)', line, re.IGNORECASE)
+            priority_match = _PRIORITY_RE.match(line)
             if priority_match:
                 priority_value = priority_match.group(1).upper()
                 if priority_value in ['LOW', 'MEDIUM', 'HIGH']:
@@ -549,31 +639,15 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
             description = '\n'.join(description_lines)
         
         if not due_time:
-            await update.message.reply_text(
-                "❌ **Invalid Format**\n\n"
-                "Please include a due date/time:\n"
-                "`Due: 2026-02-20 14:30`",
-                parse_mode='Markdown'
-            )
+            _send_async(context, update.message, _MISSING_DUE_TEXT, parse_mode='Markdown')
             return
         
         # Create reminder
-        mutation = """
-        mutation CreateReminder($input: CreateReminderInput!) {
-            createReminder(input: $input) {
-                id
-                title
-                dueTime
-                priority
-            }
-        }
-        """
-        
-        result = await gql_client.execute(mutation, {
+        result = await gql_client.execute(_CREATE_REMINDER_MUT, {
             'input': {
                 'title': title,
                 'description': description,
-                'dueTime': due_time.isoformat() if due_time.tzinfo else due_time.strftime('%Y-%m-%dT%H:%M:%S') + 'Z',
+                'dueTime': due_time.isoformat() if due_time.tzinfo else due_time.isoformat(timespec='seconds') + 'Z',
                 'priority': priority,
                 'repeatPattern': 'NONE',
                 'notificationChannels': ['telegram'],
@@ -588,19 +662,21 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
             
             await update.message.reply_text(
                 f"✅ **Reminder Created!**\n\n"
-                f"{priority_emoji} {reminder['title']}\n"
+                f"{priority_emoji} {_md_escape(reminder['title'])}\n"
                 f"📅 Due: {due_time.strftime('%A, %B %d at %I:%M %p')}\n\n"
                 "You'll receive a notification when it's due.\n\n"
                 "Use /reminders to view all your reminders.",
                 parse_mode='Markdown'
             )
         else:
-            await update.message.reply_text("❌ Failed to create reminder.")
+            _send_async(context, update.message, "❌ Failed to create reminder.")
     
     except Exception as e:
-        logger.error(f"Error creating reminder: {e}", exc_info=True)
-        error_msg = str(e)
-        await update.message.reply_text(
+        logger.exception("Error creating reminder: %s", e)
+        error_msg = _md_escape(str(e))
+        _send_async(
+            context,
+            update.message,
             f"❌ **Error Creating Reminder**\n\n"
             f"Error: {error_msg}\n\n"
             "Please use this format:\n"
@@ -610,3 +686,13 @@ async def create_reminder_from_message(update: Update, context: ContextTypes.DEF
             "Priority: HIGH`",
             parse_mode='Markdown'
         )
+
+
+# Handlers for the pending 'awaiting' step set by the menus
+_AWAITING_DISPATCH = {
+    'note': create_note_from_message,
+    'note_search': search_notes,
+    'event': create_event_from_message,
+    'event_title': finalize_event_from_template,
+    'reminder': create_reminder_from_message,
+}
@@ -8,6 +8,8 @@ from datetime import datetime, timezone
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.error import TelegramError
 
+from handlers.constants import TYPE_EMOJI
+
 logger = logging.getLogger(__name__)
 
 
@@ -150,13 +152,7 @@ async def format_notification_message(notif: dict, gql_client) -> str:
             if event:
                 start_time = datetime.fromisoformat(event['startTime'].replace('Z', '+00:00'))
                 
-                type_emoji = {
-                    'ACTIVITY': '✅',
-                    'MEETING': '👥',
-                    'LEARNING': '📚',
-                    'REMINDER': '🔔',
-                    'CUSTOM': '📌'
-                }.get(event['type'], '📌')
+                type_emoji = TYPE_EMOJI.get(event['type'], '📌')
                 
                 message = f"🔔 <b>Event Reminder</b>\n\n"
                 message += f"{type_emoji} <b>{event['title']}</b>\n"
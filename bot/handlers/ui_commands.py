@@ -4,15 +4,103 @@ Provides UI with buttons and menus instead of pure LLM
 """
 
 import logging
+from datetime import date, datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from gql import gql
+
+from handlers.callbacks import cache_skills, get_user_client
+from handlers.constants import TYPE_EMOJI
 
 logger = logging.getLogger(__name__)
 
+# GraphQL documents are parsed once at import instead of on every command
+_ACTIVE_SESSION_Q = gql("""
+query GetActiveSession {
+    activeSession {
+        id
+        name
+        status
+        duration
+        skill {
+            id
+            name
+        }
+    }
+}
+""")
+
+_SKILLS_Q = gql("""
+query GetSkills {
+    skills {
+        id
+        name
+        level
+    }
+}
+""")
+
+_EVENTS_Q = gql("""
+query GetEvents($startDate: Date!, $endDate: Date!) {
+    events(startDate: $startDate, endDate: $endDate) {
+        id
+        title
+        description
+        startTime
+        endTime
+        type
+        allDay
+    }
+}
+""")
 
-def get_user_client(context: ContextTypes.DEFAULT_TYPE):
-    """Get authenticated GraphQL client for the user"""
-    return context.user_data.get('gql_client')
+_NOTES_Q = gql("""
+query GetNotes($limit: Int!) {
+    notes(limit: $limit) {
+        nodes {
+            id
+            title
+            content
+            tags
+            createdAt
+        }
+    }
+}
+""")
+
+_REMINDERS_Q = gql("""
+query GetReminders($limit: Int!) {
+    upcomingReminders(limit: $limit) {
+        id
+        title
+        description
+        dueTime
+        completed
+        priority
+    }
+    overdueReminders {
+        id
+        title
+        dueTime
+        priority
+    }
+}
+""")
+
+_STATS_Q = gql("""
+query GetStats($startDate: Date!, $endDate: Date!) {
+    activityStats(startDate: $startDate, endDate: $endDate) {
+        totalActivities
+        totalMinutes
+        totalHours
+        skillBreakdown {
+            skillName
+            activityCount
+            totalHours
+        }
+    }
+}
+""")
 
 
 def require_auth(func):
@@ -33,41 +121,21 @@ async def session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     Handle /session command - Unified session management and skills view
     Shows quick start/stop buttons + active session + skills list
     """
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await update.message.reply_text("❌ Error: Authentication issue. Please /logout and login again.")
         return
     
-    # Fetch active session and skills separately to avoid timeout
-    session_query = """
-    query GetActiveSession {
-        activeSession {
-            id
-            name
-            status
-            duration
-            skill {
-                id
-                name
-            }
-        }
-    }
-    """
-    
-    skills_query = """
-    query GetSkills {
-        skills {
-            id
-            name
-            level
-        }
-    }
-    """
-    
     try:
-        # Fetch session first (usually faster)
-        session_result = await gql_client.execute(session_query)
+        # Both queries are independent - run them concurrently
+        session_result, skills_result = await gql_client.execute_many(
+            (_ACTIVE_SESSION_Q, None),
+            (_SKILLS_Q, None),
+            return_exceptions=True
+        )
+        if isinstance(session_result, Exception):
+            raise session_result
         active_session = session_result.get('activeSession')
         
         # Debug logging
@@ -76,14 +144,14 @@ async def session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         else:
             logger.info("No active session")
         
-        # Fetch skills
-        try:
-            skills_result = await gql_client.execute(skills_query)
+        if isinstance(skills_result, Exception):
+            logger.warning(f"Failed to fetch skills: {skills_result}")
+            skills_list = []  # Continue without skills list
+        else:
             skills_list = skills_result.get('skills', [])
             logger.info(f"Skills count: {len(skills_list)}")
-        except Exception as e:
-            logger.warning(f"Failed to fetch skills: {e}")
-            skills_list = []  # Continue without skills list
+            # Reused by the skill picker and quick-start buttons
+            cache_skills(context, skills_list)
         
         message = ""
         keyboard = []
@@ -193,32 +261,16 @@ async def schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Handle /schedule command - Show today's schedule with navigation and event creation
     """
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await update.message.reply_text("❌ Error: Authentication issue. Please /logout and login again.")
         return
     
-    from datetime import date, datetime
-    
     today = date.today()
     
-    query = """
-    query GetEvents($startDate: Date!, $endDate: Date!) {
-        events(startDate: $startDate, endDate: $endDate) {
-            id
-            title
-            description
-            startTime
-            endTime
-            type
-            allDay
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(query, {
+        result = await gql_client.execute(_EVENTS_Q, {
             'startDate': today.isoformat(),
             'endDate': today.isoformat()
         })
@@ -235,13 +287,7 @@ async def schedule(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             message += "_Add your first event using the buttons below._"
         else:
             for event in sorted_events:
-                type_emoji = {
-                    'ACTIVITY': '✅',
-                    'MEETING': '👥',
-                    'LEARNING': '📚',
-                    'REMINDER': '🔔',
-                    'CUSTOM': '📌'
-                }.get(event.get('type', ''), '📌')
+                type_emoji = TYPE_EMOJI.get(event.get('type', ''), '📌')
                 
                 title = event['title']
                 start_time = event.get('startTime', '')
@@ -292,28 +338,14 @@ async def notes_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     """
     Handle /notes command - List recent notes with interactive UI
     """
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await update.message.reply_text("❌ Error: Authentication issue. Please /logout and login again.")
         return
     
-    query = """
-    query GetNotes($limit: Int!) {
-        notes(limit: $limit) {
-            nodes {
-                id
-                title
-                content
-                tags
-                createdAt
-            }
-        }
-    }
-    """
-    
     try:
-        result = await gql_client.execute(query, {'limit': 10})
+        result = await gql_client.execute(_NOTES_Q, {'limit': 10})
         notes_data = result.get('notes', {}).get('nodes', [])
         
         if not notes_data:
@@ -375,35 +407,14 @@ async def reminders_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """
     Handle /reminders command - List and manage reminders
     """
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await update.message.reply_text("❌ Error: Authentication issue. Please /logout and login again.")
         return
     
-    query = """
-    query GetReminders($limit: Int!) {
-        upcomingReminders(limit: $limit) {
-            id
-            title
-            description
-            dueTime
-            completed
-            priority
-        }
-        overdueReminders {
-            id
-            title
-            dueTime
-            priority
-        }
-    }
-    """
-    
     try:
-        from datetime import datetime
-        
-        result = await gql_client.execute(query, {'limit': 20})
+        result = await gql_client.execute(_REMINDERS_Q, {'limit': 20})
         upcoming = result.get('upcomingReminders', [])
         overdue = result.get('overdueReminders', [])
         
@@ -471,45 +482,22 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     """
     Handle /stats command - Show activity statistics
     """
-    gql_client = get_user_client(context)
+    gql_client = get_user_client(update, context)
     
     if not gql_client:
         await update.message.reply_text("❌ Error: Authentication issue. Please /logout and login again.")
         return
     
-    from datetime import date, timedelta
-    
     today = date.today()
     week_start = today - timedelta(days=today.weekday())
     week_end = week_start + timedelta(days=6)
     
-    query = """
-    query GetStats($startDate: Date!, $endDate: Date!) {
-        activityStats(startDate: $startDate, endDate: $endDate) {
-            totalActivities
-            totalMinutes
-            totalHours
-            skillBreakdown {
-                skillName
-                activityCount
-                totalHours
-            }
-        }
-    }
-    """
-    
     try:
-        # Get today's stats
-        today_result = await gql_client.execute(query, {
-            'startDate': today.isoformat(),
-            'endDate': today.isoformat()
-        })
-        
-        # Get week stats
-        week_result = await gql_client.execute(query, {
-            'startDate': week_start.isoformat(),
-            'endDate': week_end.isoformat()
-        })
+        # Today's and this week's stats are independent - fetch them concurrently
+        today_result, week_result = await gql_client.execute_many(
+            (_STATS_Q, {'startDate': today.isoformat(), 'endDate': today.isoformat()}),
+            (_STATS_Q, {'startDate': week_start.isoformat(), 'endDate': week_end.isoformat()})
+        )
         
         today_stats = today_result.get('activityStats', {})
         week_stats = week_result.get('activityStats', {})
@@ -7,7 +7,7 @@ from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQu
 
 from handlers import commands, ui_commands, callbacks, message_handlers, file_handlers
 from handlers.notifications import start_notification_loop
-from backend_client.simple_client import GraphQLClient
+from backend_client.simple_client import GraphQLClient, close_shared_connector
 from config import Config
 
 # LLM logic archived - see archived_llm/ directory
@@ -48,6 +48,10 @@ async def post_init(application: Application) -> None:
     logger.info("Initializing base GraphQL client...")
     base_client = GraphQLClient(Config.BACKEND_URL, None)
     application.bot_data['gql_client'] = base_client
+    message_handlers.init(base_client)
+    
+    # Create file storage once here so uploads can assume it exists
+    os.makedirs(Config.FILE_STORAGE_PATH, exist_ok=True)
     
     # Initialize active users dict for notification tracking
     # {telegram_id: {'gql_client': client, 'user_id': uuid, 'name': str}}
@@ -64,16 +68,30 @@ async def post_init(application: Application) -> None:
     logger.info("Bot initialization complete (per-user auth with notifications)")
 
 
+async def post_shutdown(application: Application) -> None:
+    """Release pooled backend connections on shutdown"""
+    # Each GraphQLClient keeps a permanent keep-alive session - close them all
+    clients = [application.bot_data.get('gql_client')]
+    clients.extend(user['gql_client'] for user in application.bot_data.get('active_users', {}).values())
+    for client in clients:
+        if client:
+            await client.close()
+    await close_shared_connector()
+    logger.info("Closed GraphQL sessions")
+
+
 def main() -> None:
     """Start the bot"""
     # Validate config
-    if not Config.TELEGRAM_BOT_TOKEN:
-        raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
+    Config.validate()
     
     # Create application
     application = Application.builder() \
         .token(Config.TELEGRAM_BOT_TOKEN) \
+        .http_version("2") \
+        .pool_timeout(Config.TELEGRAM_POOL_TIMEOUT) \
         .post_init(post_init) \
+        .post_shutdown(post_shutdown) \
         .build()
     
     # Register command handlers
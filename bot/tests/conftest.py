@@ -2,8 +2,57 @@
 Test configuration file for pytest
 """
 
-import sys
-import os
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from telegram import Update, User as TelegramUser, Message, Chat
+from telegram.ext import ContextTypes
 
-# Add parent directory to path so tests can import modules
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+@pytest.fixture
+def mock_update():
+    """Create a mock Telegram Update"""
+    update = MagicMock(spec=Update)
+    update.effective_user = MagicMock(spec=TelegramUser)
+    update.effective_user.id = 123456
+    update.effective_user.first_name = "Test"
+    update.effective_user.username = "testuser"
+    update.effective_user.mention_html = MagicMock(return_value="<a href='tg://user?id=123456'>Test</a>")
+    update.message = MagicMock(spec=Message)
+    update.message.text = "/start"
+    update.message.reply_text = AsyncMock()
+    update.message.reply_html = AsyncMock()
+    update.message.chat = MagicMock(spec=Chat)
+    update.message.chat.id = 123456
+    return update
+
+
+@pytest.fixture
+def mock_context():
+    """Create a mock context"""
+    context = MagicMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.user_data = {}
+    context.args = []
+    context.bot = MagicMock()
+    context.bot.send_message = AsyncMock()
+    # Run fire-and-forget tasks on the test loop, like Application.create_task
+    context.application = MagicMock()
+    context.application.create_task = MagicMock(side_effect=lambda coro, **kwargs: asyncio.ensure_future(coro))
+    return context
+
+
+@pytest.fixture
+def gql_client():
+    """Create a mock per-user GraphQL client (tests set execute's return_value/side_effect)"""
+    client = MagicMock()
+    client.execute = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def callback_update(mock_update):
+    """Create a mock Update carrying an inline button callback query"""
+    mock_update.callback_query = MagicMock()
+    mock_update.callback_query.answer = AsyncMock()
+    mock_update.callback_query.edit_message_text = AsyncMock()
+    return mock_update
@@ -27,12 +27,27 @@ class TestGraphQLClient:
         client = GraphQLClient(url="http://test.local/graphql", auth_token="my-token")
         assert client.auth_token == "my-token"
     
-    def test_set_auth_token(self, client):
+    @pytest.mark.asyncio
+    async def test_set_auth_token(self, client):
         """Test setting auth token updates client"""
         new_token = "new-test-token"
-        client.set_auth_token(new_token)
+        await client.set_auth_token(new_token)
         assert client.auth_token == new_token
     
+    @pytest.mark.asyncio
+    async def test_set_auth_token_closes_open_session(self, client):
+        """Test re-tokening a connected client closes its session before rebuilding"""
+        old_client = MagicMock()
+        old_client.close_async = AsyncMock()
+        client._client = old_client
+        client._session = AsyncMock()
+        
+        await client.set_auth_token("new-test-token")
+        
+        old_client.close_async.assert_awaited_once()
+        assert client._session is None
+        assert client._client is not old_client
+    
     @pytest.mark.asyncio
     async def test_login_success(self, client):
         """Test successful login"""
@@ -79,12 +94,9 @@ class TestGraphQLClient:
         # Mock the gql client session
         mock_session = AsyncMock()
         mock_session.execute = AsyncMock(return_value=expected_result)
-        mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_session.__aexit__ = AsyncMock(return_value=None)
         
         client._client = MagicMock()
-        client._client.__aenter__ = AsyncMock(return_value=mock_session)
-        client._client.__aexit__ = AsyncMock(return_value=None)
+        client._client.connect_async = AsyncMock(return_value=mock_session)
         
         result = await client.execute(query)
         assert result == expected_result
@@ -98,15 +110,56 @@ class TestGraphQLClient:
         
         mock_session = AsyncMock()
         mock_session.execute = AsyncMock(return_value=expected_result)
-        mock_session.__aenter__ = AsyncMock(return_value=mock_session)
-        mock_session.__aexit__ = AsyncMock(return_value=None)
         
         client._client = MagicMock()
-        client._client.__aenter__ = AsyncMock(return_value=mock_session)
-        client._client.__aexit__ = AsyncMock(return_value=None)
+        client._client.connect_async = AsyncMock(return_value=mock_session)
         
         result = await client.execute(query, variables)
         assert result == expected_result
+    
+    @pytest.mark.asyncio
+    async def test_execute_preparsed_document(self, client):
+        """Test executing a document already parsed with gql()"""
+        from gql import gql
+        document = gql("query { me { id } }")
+        
+        mock_session = AsyncMock()
+        mock_session.execute = AsyncMock(return_value={'me': {'id': 'user-1'}})
+        
+        client._client = MagicMock()
+        client._client.connect_async = AsyncMock(return_value=mock_session)
+        
+        await client.execute(document)
+        assert mock_session.execute.call_args[0][0] is document
+    
+    @pytest.mark.asyncio
+    async def test_execute_many_preserves_order(self, client):
+        """Test concurrent requests return results in request order"""
+        async def fake_execute(query, variables=None):
+            return {'echo': variables['n']}
+        
+        with patch.object(client, 'execute', new=AsyncMock(side_effect=fake_execute)):
+            results = await client.execute_many(("q", {'n': 1}), ("q", {'n': 2}))
+        
+        assert results == [{'echo': 1}, {'echo': 2}]
+    
+    @pytest.mark.asyncio
+    async def test_execute_reuses_session(self, client):
+        """Test consecutive queries share one permanent session"""
+        mock_session = AsyncMock()
+        mock_session.execute = AsyncMock(return_value={'me': None})
+        
+        client._client = MagicMock()
+        client._client.connect_async = AsyncMock(return_value=mock_session)
+        client._client.close_async = AsyncMock()
+        
+        await client.execute("query { me { id } }")
+        await client.execute("query { me { id } }")
+        assert client._client.connect_async.await_count == 1
+        assert mock_session.execute.await_count == 2
+        
+        await client.close()
+        client._client.close_async.assert_awaited_once()
 
 
 class TestEntityResolution:
@@ -137,16 +190,35 @@ class TestEntityResolution:
         query = 'mutation { stopActivity(id: "ACTIVITY_ID_PLACEHOLDER") { id } }'
         mock_activity_id = "activity-789"
         
-        # Note: The regex pattern in execute_with_resolution matches ACTIVITY_ID_PLACEHOLDER as a skill placeholder
-        # So we need to mock _resolve_skill even though we're testing activity resolution
-        with patch.object(client, '_resolve_skill', new=AsyncMock(return_value="dummy-skill-id")):
+        # ACTIVITY_ID_PLACEHOLDER must not trigger skill resolution
+        mock_resolve_skill = AsyncMock(return_value="dummy-skill-id")
+        with patch.object(client, '_resolve_skill', new=mock_resolve_skill):
             # Mock _resolve_active_session to return an activity ID
             with patch.object(client, '_resolve_active_session', new=AsyncMock(return_value=mock_activity_id)):
                 # Mock execute to return success after placeholder replacement
-                with patch.object(client, 'execute', new=AsyncMock(return_value={'stopActivity': {'id': 'activity-789'}})):
+                mock_execute = AsyncMock(return_value={'stopActivity': {'id': 'activity-789'}})
+                with patch.object(client, 'execute', new=mock_execute):
                     result = await client.execute_with_resolution(query, user_message="stop session")
-                    
+
                     assert result['stopActivity']['id'] == 'activity-789'
+                    assert f'"{mock_activity_id}"' in mock_execute.call_args[0][0]
+                    mock_resolve_skill.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_skill_and_activity_placeholders_resolved_together(self, client):
+        """Test query with both skill and activity placeholders resolves each one"""
+        query = 'mutation { logActivity(skillId: "SKILL_ID_PLACEHOLDER", sessionId: "ACTIVITY_ID_PLACEHOLDER") { id } }'
+
+        with patch.object(client, '_resolve_skill', new=AsyncMock(return_value="skill-123")):
+            with patch.object(client, '_resolve_active_session', new=AsyncMock(return_value="activity-789")):
+                mock_execute = AsyncMock(return_value={'logActivity': {'id': 'log-1'}})
+                with patch.object(client, 'execute', new=mock_execute):
+                    await client.execute_with_resolution(query, user_message="practice Python")
+
+                    resolved_query = mock_execute.call_args[0][0]
+                    assert '"skill-123"' in resolved_query
+                    assert '"activity-789"' in resolved_query
+                    assert 'PLACEHOLDER' not in resolved_query
     
     @pytest.mark.asyncio
     async def test_resolution_skill_not_found(self, client):
@@ -167,3 +239,21 @@ class TestEntityResolution:
             result = await client._resolve_active_session()
             # Should return None when no active session exists
             assert result is None
+    
+    def test_extract_skill_name_capitalized_fallback(self, client):
+        """Test fallback picks the first capitalized non-stopword"""
+        assert client._extract_skill_name("The Guitar, please") == "Guitar"
+        assert client._extract_skill_name("nothing to see here") is None
+    
+    def test_extract_skill_name_patterns(self, client):
+        """Test each extraction pattern"""
+        assert client._extract_skill_name("start a Python session") == "Python"
+        assert client._extract_skill_name("start session for Guitar") == "Guitar"
+        assert client._extract_skill_name("I am practicing Piano") == "Piano"
+        assert client._extract_skill_name("Math study session") == "Math"
+    
+    def test_extract_skill_name_pattern_priority(self, client):
+        """Test the specific patterns win over the generic "<name> coding session" form"""
+        assert client._extract_skill_name("I want to start a Python coding session") == "Python"
+        assert client._extract_skill_name("Please start a Guitar practice session") == "Guitar"
+        assert client._extract_skill_name("my new coding session for Java") == "Java"
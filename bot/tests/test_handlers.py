@@ -2,38 +2,9 @@
 Tests for command handlers
 """
 
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from telegram import Update, User as TelegramUser, Message, Chat
-from telegram.ext import ContextTypes
-
-
-@pytest.fixture
-def mock_update():
-    """Create a mock Telegram Update"""
-    update = MagicMock(spec=Update)
-    update.effective_user = MagicMock(spec=TelegramUser)
-    update.effective_user.id = 123456
-    update.effective_user.first_name = "Test"
-    update.effective_user.username = "testuser"
-    update.effective_user.mention_html = MagicMock(return_value="<a href='tg://user?id=123456'>Test</a>")
-    update.message = MagicMock(spec=Message)
-    update.message.text = "/start"
-    update.message.reply_text = AsyncMock()
-    update.message.reply_html = AsyncMock()
-    update.message.chat = MagicMock(spec=Chat)
-    update.message.chat.id = 123456
-    return update
-
-
-@pytest.fixture
-def mock_context():
-    """Create a mock context"""
-    context = MagicMock(spec=ContextTypes.DEFAULT_TYPE)
-    context.user_data = {}
-    context.bot = MagicMock()
-    context.bot.send_message = AsyncMock()
-    return context
 
 
 class TestStartCommand:
@@ -53,6 +24,43 @@ class TestStartCommand:
         assert mock_update.message.reply_html.called
         call_args = str(mock_update.message.reply_html.call_args)
         assert "Welcome" in call_args or "Hi" in call_args
+    
+    @pytest.mark.asyncio
+    async def test_start_with_inline_email(self, mock_update, mock_context):
+        """Test /start <email> skips straight to the password prompt"""
+        from handlers.commands import start
+        mock_context.args = ['test@example.com']
+        
+        await start(mock_update, mock_context)
+        
+        assert mock_context.user_data['login_email'] == 'test@example.com'
+        assert mock_context.user_data['awaiting'] == 'password'
+        assert "password" in str(mock_update.message.reply_text.call_args)
+
+
+class TestPasswordLogin:
+    """Test the password step of the login flow"""
+    
+    @pytest.mark.asyncio
+    async def test_failed_login_closes_client_and_keeps_timezone(self, mock_update, mock_context):
+        """Test a rejected password closes the login session and only drops login state"""
+        from handlers.message_handlers import process_password
+        
+        login_client = MagicMock()
+        login_client.login = AsyncMock(side_effect=ValueError("Login failed: invalid credentials"))
+        login_client.close = AsyncMock()
+        mock_context.bot_data = {'active_users': {}}
+        mock_context.user_data.update({'login_email': 'test@example.com', 'awaiting': 'password', 'timezone': 'Europe/Berlin'})
+        mock_update.message.text = "wrong-password"
+        mock_update.message.delete = AsyncMock()
+        mock_update.effective_chat = MagicMock()
+        mock_update.effective_chat.send_message = AsyncMock()
+        
+        with patch('backend_client.simple_client.GraphQLClient', return_value=login_client):
+            await process_password(mock_update, mock_context, MagicMock(url="http://test.local/graphql", timeout=10))
+        
+        login_client.close.assert_awaited_once()
+        assert mock_context.user_data == {'timezone': 'Europe/Berlin'}
 
 
 class TestHelpCommand:
@@ -80,6 +88,7 @@ class TestLogoutCommand:
         """Test /logout command for authenticated user"""
         mock_context.user_data['auth_token'] = 'test-token'
         mock_context.user_data['user_email'] = 'test@example.com'
+        mock_context.user_data['timezone'] = 'Europe/Paris'
         
         from handlers.commands import logout
         
@@ -88,8 +97,10 @@ class TestLogoutCommand:
         
         await logout(mock_update, mock_context)
         
-        # Verify user data was cleared
+        # Verify session data was cleared but preferences kept
         assert 'auth_token' not in mock_context.user_data
+        assert 'user_email' not in mock_context.user_data
+        assert mock_context.user_data['timezone'] == 'Europe/Paris'
         # Verify reply was sent
         assert mock_update.message.reply_html.called
     
@@ -107,3 +118,456 @@ class TestLogoutCommand:
         
         # Verify message was sent
         assert mock_update.message.reply_text.called
+
+
+class TestTimezoneCommand:
+    """Test /timezone command"""
+    
+    @pytest.mark.asyncio
+    async def test_valid_timezone_is_stored(self, mock_update, mock_context):
+        """Test a known IANA name is saved"""
+        from handlers.commands import timezone_command
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.args = ['Europe/Paris']
+        
+        await timezone_command(mock_update, mock_context)
+        
+        assert mock_context.user_data['timezone'] == 'Europe/Paris'
+        assert "Timezone Updated" in str(mock_update.message.reply_html.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_invalid_timezone_is_rejected(self, mock_update, mock_context):
+        """Test an unknown name is rejected without touching user data"""
+        from handlers.commands import timezone_command
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.args = ['Mars/Olympus']
+        
+        await timezone_command(mock_update, mock_context)
+        
+        assert 'timezone' not in mock_context.user_data
+        assert "Invalid Timezone" in str(mock_update.message.reply_html.call_args)
+
+
+class TestStartSessionCallback:
+    """Test starting a session from an inline skill button"""
+    
+    @pytest.mark.asyncio
+    async def test_start_session_single_round_trip(self, callback_update, mock_context, gql_client):
+        """Test the session starts with one mutation and uses the cached skill name"""
+        from handlers.callbacks import start_session_for_skill
+        
+        gql_client.execute.return_value = {
+            'startSession': {
+                'id': 'session-1',
+                'name': 'Python practice',
+                'status': 'ACTIVE',
+                'startedAt': '2024-01-01T10:00:00Z',
+                'skill': {'id': 'skill-1', 'name': 'Python'}
+            }
+        }
+        from handlers.callbacks import cache_skills
+        cache_skills(mock_context, [{'id': 'skill-1', 'name': 'Python', 'level': 'BEGINNER'}])
+        
+        await start_session_for_skill(callback_update, mock_context, gql_client, "start_skill:skill-1")
+        
+        gql_client.execute.assert_awaited_once()
+        assert gql_client.execute.call_args[0][1]['name'] == 'Python practice'
+        assert "Python" in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_start_session_already_active(self, callback_update, mock_context, gql_client):
+        """Test a known backend error is mapped to its friendly message"""
+        from gql.transport.exceptions import TransportQueryError
+        from handlers.callbacks import start_session_for_skill
+        
+        gql_client.execute.side_effect = TransportQueryError(
+            "error", errors=[{'message': 'You already have an active session'}]
+        )
+        
+        await start_session_for_skill(callback_update, mock_context, gql_client, "start_skill:skill-1")
+        
+        assert "Session Already Active" in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_start_session_timeout_is_not_retried(self, callback_update, mock_context, gql_client):
+        """Test a timed-out start is reported, not repeated - the first write may have landed"""
+        from handlers.callbacks import start_session_for_skill
+        
+        gql_client.execute.side_effect = TimeoutError()
+        
+        await start_session_for_skill(callback_update, mock_context, gql_client, "start_skill:skill-1")
+        
+        assert gql_client.execute.await_count == 1
+        assert "Timed Out" in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_pause_session_retries_timeout_once(self, callback_update, mock_context, gql_client):
+        """Test a single timeout on an idempotent transition is retried"""
+        from handlers.callbacks import pause_session
+        
+        gql_client.execute.side_effect = [TimeoutError(), {'pauseSession': {'id': 'session-1'}}]
+        
+        with patch('handlers.callbacks.asyncio.sleep', new=AsyncMock()):
+            await pause_session(callback_update, mock_context, gql_client, "pause_session:session-1")
+        
+        assert gql_client.execute.await_count == 2
+        assert "Session Paused" in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_retry_finding_target_state_reports_success(self, callback_update, mock_context, gql_client):
+        """Test a retry rejected as already paused means the timed-out pause was committed"""
+        from gql.transport.exceptions import TransportQueryError
+        from handlers.callbacks import pause_session
+        
+        gql_client.execute.side_effect = [
+            TimeoutError(),
+            TransportQueryError("error", errors=[{'message': 'session is not active'}])
+        ]
+        
+        with patch('handlers.callbacks.asyncio.sleep', new=AsyncMock()):
+            await pause_session(callback_update, mock_context, gql_client, "pause_session:session-1")
+        
+        assert "Session Paused" in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_target_state_error_without_retry_is_reported(self, callback_update, mock_context, gql_client):
+        """Test the same error on a first attempt is still shown as an error"""
+        from gql.transport.exceptions import TransportQueryError
+        from handlers.callbacks import resume_session
+        
+        gql_client.execute.side_effect = TransportQueryError("error", errors=[{'message': 'session is not paused'}])
+        
+        await resume_session(callback_update, mock_context, gql_client, "resume_session:session-1")
+        
+        assert "❌ Error: session is not paused" in str(callback_update.callback_query.edit_message_text.call_args)
+
+
+class TestCallbackRouting:
+    """Test handle_callback dispatch"""
+    
+    @pytest.mark.asyncio
+    async def test_routes_on_prefix(self, callback_update, mock_context, gql_client):
+        """Test callback data is dispatched by the prefix before ':'"""
+        from handlers import callbacks
+        
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.user_data['gql_client'] = gql_client
+        callback_update.callback_query.data = "pause_session:session-1"
+        
+        mock_pause = AsyncMock()
+        with patch.dict(callbacks.ROUTES, {'pause_session': (mock_pause, True)}):
+            await callbacks.handle_callback(callback_update, mock_context)
+        
+        mock_pause.assert_awaited_once_with(callback_update, mock_context, gql_client, "pause_session:session-1")
+    
+    @pytest.mark.asyncio
+    async def test_unknown_action(self, callback_update, mock_context, gql_client):
+        """Test unknown callback data is reported"""
+        from handlers.callbacks import handle_callback
+        
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.user_data['gql_client'] = gql_client
+        callback_update.callback_query.data = "bogus:1"
+        
+        await handle_callback(callback_update, mock_context)
+        
+        assert "Unknown action" in str(callback_update.callback_query.edit_message_text.call_args)
+
+
+class TestSkillSelectionCache:
+    """Test the skills list TTL cache"""
+    
+    @pytest.mark.asyncio
+    async def test_second_open_uses_cache(self, callback_update, mock_context, gql_client):
+        """Test reopening the skill picker within the TTL skips the query"""
+        from handlers.callbacks import show_skill_selection
+        
+        gql_client.execute.return_value = {
+            'skills': [{'id': 'skill-1', 'name': 'Python', 'level': 'BEGINNER'}]
+        }
+        
+        await show_skill_selection(callback_update, mock_context, gql_client)
+        await show_skill_selection(callback_update, mock_context, gql_client)
+        
+        gql_client.execute.assert_awaited_once()
+        assert callback_update.callback_query.edit_message_text.await_count == 2
+
+
+class TestEventDetail:
+    """Test the event detail view"""
+    
+    @pytest.mark.asyncio
+    async def test_summary_then_details(self, callback_update, mock_context, gql_client):
+        """Test the view fetches summary fields and Details loads the full event"""
+        from handlers import callbacks
+        
+        gql_client.execute.return_value = {
+            'event': {
+                'id': 'event-1',
+                'title': 'Standup',
+                'startTime': '2026-02-13T09:00:00Z',
+                'endTime': '2026-02-13T09:15:00Z',
+                'type': 'MEETING',
+                'allDay': False
+            }
+        }
+        
+        await callbacks.show_event_detail(callback_update, mock_context, gql_client, 'event-1')
+        assert gql_client.execute.call_args[0][0] is callbacks._EVENT_MIN_Q
+        assert "event:details:event-1" in str(callback_update.callback_query.edit_message_text.call_args)
+        
+        await callbacks.show_event_detail(callback_update, mock_context, gql_client, 'event-1', full=True)
+        assert gql_client.execute.call_args[0][0] is callbacks._EVENT_FULL_Q
+        assert "event:details" not in str(callback_update.callback_query.edit_message_text.call_args)
+    
+    @pytest.mark.asyncio
+    async def test_user_fields_are_html_escaped(self, callback_update, mock_context, gql_client):
+        """Test titles with markup characters are escaped for HTML parse mode"""
+        from handlers.callbacks import show_event_detail
+        
+        gql_client.execute.return_value = {
+            'event': {'id': 'event-1', 'title': '<R&D> *sync*', 'type': 'MEETING', 'allDay': True}
+        }
+        
+        await show_event_detail(callback_update, mock_context, gql_client, 'event-1')
+        
+        args, kwargs = callback_update.callback_query.edit_message_text.call_args
+        assert "<b>&lt;R&amp;D&gt; *sync*</b>" in args[0]
+        assert kwargs['parse_mode'] == 'HTML'
+
+
+class TestGetUserClient:
+    """Test per-user client lookup"""
+    
+    def test_builds_client_once_from_token(self, mock_update, mock_context):
+        """Test a missing client is built from the base client, registered and then reused"""
+        from backend_client.simple_client import GraphQLClient
+        from handlers.callbacks import get_user_client
+        
+        mock_context.bot_data = {'gql_client': GraphQLClient("http://test.local/graphql"), 'active_users': {}}
+        mock_context.user_data.update({'auth_token': 'test-token', 'user_id': 'user-1'})
+        
+        client = get_user_client(mock_update, mock_context)
+        assert client.auth_token == 'test-token'
+        assert client.url == "http://test.local/graphql"
+        assert get_user_client(mock_update, mock_context) is client
+        assert mock_context.bot_data['active_users'][123456]['gql_client'] is client
+    
+    def test_no_client_without_token(self, mock_update, mock_context):
+        """Test logged-out users get no client"""
+        from handlers.callbacks import get_user_client
+        
+        mock_context.bot_data = {'gql_client': MagicMock()}
+        assert get_user_client(mock_update, mock_context) is None
+
+
+class TestFileDownload:
+    """Test downloading files from the inline menu"""
+    
+    @pytest.mark.asyncio
+    async def test_menu_listing_serves_download_click(self, callback_update, mock_context, gql_client):
+        """Test a click after opening the menu reuses the listing instead of a File query"""
+        from handlers.file_handlers import download_file_command
+        
+        listed = {
+            'id': 'file-1', 'originalFilename': 'notes.pdf', 'directory': '/docs',
+            'mimeType': 'application/pdf', 'fileSize': 2048, 'telegramFileId': 'tg-1',
+            'storagePath': 'notes.pdf', 'description': None
+        }
+        gql_client.execute.return_value = {'files': {'nodes': [listed]}}
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.user_data['gql_client'] = gql_client
+        callback_update.callback_query.message.reply_document = AsyncMock()
+        
+        callback_update.callback_query.data = "files_download_menu:/docs"
+        await download_file_command(callback_update, mock_context)
+        callback_update.callback_query.data = "files_download:file-1"
+        await download_file_command(callback_update, mock_context)
+        
+        gql_client.execute.assert_awaited_once()
+        assert callback_update.callback_query.message.reply_document.call_args.kwargs['document'] == 'tg-1'
+    
+    @pytest.mark.asyncio
+    async def test_failed_answer_cancels_file_lookup(self, callback_update, mock_context, gql_client):
+        """Test the prefetched File query is cancelled when answering the callback fails"""
+        from handlers.file_handlers import download_file_command
+        
+        finished = []
+        
+        async def slow_execute(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            finished.append(args)
+            return {'file': None}
+        
+        gql_client.execute = slow_execute
+        mock_context.user_data['auth_token'] = 'test-token'
+        mock_context.user_data['gql_client'] = gql_client
+        callback_update.callback_query.answer = AsyncMock(side_effect=[RuntimeError("network down"), None])
+        callback_update.callback_query.data = "files_download:file-1"
+        
+        await download_file_command(callback_update, mock_context)
+        await asyncio.sleep(0.05)
+        
+        assert finished == []
+
+
+class TestEventMessage:
+    """Test creating events from text messages"""
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("date_text", [
+        "2026-02-13 14:00", "2026-02-13 14:00:00", "2026-02-13T14:00", "02/13/2026 14:00", "2026-02-13T15:00:00+01:00"
+    ])
+    async def test_accepted_date_formats(self, mock_update, mock_context, gql_client, date_text):
+        """Test every accepted start format yields the same event times"""
+        from handlers.message_handlers import create_event_from_message
+        
+        gql_client.execute.return_value = {'createEvent': {'id': 'event-1', 'title': 'Team Meeting'}}
+        mock_context.user_data['gql_client'] = gql_client
+        mock_update.message.text = f"Team Meeting\n{date_text}\n60\nMEETING"
+        
+        await create_event_from_message(mock_update, mock_context)
+        
+        event_input = gql_client.execute.call_args[0][1]['input']
+        assert event_input['startTime'] == '2026-02-13T14:00:00Z'
+        assert event_input['endTime'] == '2026-02-13T15:00:00Z'
+        assert event_input['type'] == 'MEETING'
+    
+    @pytest.mark.asyncio
+    async def test_trailing_lines_do_not_affect_type(self, mock_update, mock_context, gql_client):
+        """Test lines after the type line are ignored"""
+        from handlers.message_handlers import create_event_from_message
+        
+        gql_client.execute.return_value = {'createEvent': {'id': 'event-1', 'title': 'Standup'}}
+        mock_context.user_data['gql_client'] = gql_client
+        mock_update.message.text = "Standup\r\n2026-02-13 09:00\r\n15\r\nmeeting\r\nbring notes\r\nroom 4"
+        
+        await create_event_from_message(mock_update, mock_context)
+        
+        event_input = gql_client.execute.call_args[0][1]['input']
+        assert event_input['title'] == 'Standup'
+        assert event_input['type'] == 'MEETING'
+    
+    @pytest.mark.asyncio
+    async def test_template_with_custom_title(self, mock_update, mock_context, gql_client):
+        """Test a template created from the menu is finalized with the sent title"""
+        from handlers.message_handlers import EventTemplate, finalize_event_from_template
+        
+        gql_client.execute.return_value = {'createEvent': {'id': 'event-1', 'title': 'Deep work'}}
+        mock_context.user_data['gql_client'] = gql_client
+        mock_context.user_data['event_template'] = EventTemplate(
+            'Focus Block', 'LEARNING', '2026-02-13T09:00:00', '2026-02-13T11:00:00'
+        )
+        mock_update.message.text = "Deep work"
+        
+        await finalize_event_from_template(mock_update, mock_context)
+        
+        event_input = gql_client.execute.call_args[0][1]['input']
+        assert event_input['title'] == 'Deep work'
+        assert event_input['type'] == 'LEARNING'
+        assert event_input['startTime'] == '2026-02-13T09:00:00'
+        assert 'event_template' not in mock_context.user_data
+    
+    @pytest.mark.asyncio
+    async def test_invalid_date_is_rejected(self, mock_update, mock_context, gql_client):
+        """Test an unparseable start time never reaches the backend"""
+        from handlers.message_handlers import create_event_from_message
+        
+        mock_context.user_data['gql_client'] = gql_client
+        mock_update.message.text = "Team Meeting\n2026-13-45 25:00\n60"
+        
+        await create_event_from_message(mock_update, mock_context)
+        
+        gql_client.execute.assert_not_awaited()
+        assert "Invalid Date/Time" in mock_update.message.reply_text.call_args[0][0]
+
+
+class TestHandleMessage:
+    """Test routing of free-text messages"""
+    
+    @pytest.mark.asyncio
+    async def test_awaiting_flag_dispatches_once(self, mock_update, mock_context, gql_client):
+        """Test a pending note is created and the flag is consumed"""
+        from handlers.message_handlers import handle_message
+        
+        gql_client.execute.return_value = {'createNote': {'id': 'note-1', 'title': 'Groceries', 'tags': []}}
+        mock_context.user_data.update({'gql_client': gql_client, 'awaiting': 'note'})
+        mock_update.message.text = "Groceries\nMilk and eggs"
+        
+        await handle_message(mock_update, mock_context)
+        gql_client.execute.assert_awaited_once()
+        assert 'awaiting' not in mock_context.user_data
+        
+        await handle_message(mock_update, mock_context)
+        gql_client.execute.assert_awaited_once()
+        assert "Quick Commands" in mock_update.message.reply_text.call_args[0][0]
+    
+    @pytest.mark.asyncio
+    async def test_update_without_text_is_ignored(self, mock_update, mock_context):
+        """Test edited or non-text updates return before touching the flags"""
+        from handlers.message_handlers import handle_message
+        
+        mock_context.user_data['awaiting'] = 'note'
+        mock_update.message = None
+        await handle_message(mock_update, mock_context)
+        
+        assert mock_context.user_data['awaiting'] == 'note'
+
+
+class TestNoteMessage:
+    """Test creating notes from text messages"""
+    
+    @pytest.mark.asyncio
+    async def test_multiline_note_with_tags(self, mock_update, mock_context, gql_client):
+        """Test the first line is the title and tags are stripped from the content"""
+        from handlers.message_handlers import create_note_from_message
+        
+        gql_client.execute.return_value = {'createNote': {'id': 'note-1', 'title': 'Meeting Notes', 'tags': []}}
+        mock_context.user_data['gql_client'] = gql_client
+        mock_update.message.text = "  Meeting Notes\nDiscussed project timeline\n#work #meeting  "
+        
+        await create_note_from_message(mock_update, mock_context)
+        
+        note_input = gql_client.execute.call_args[0][1]['input']
+        assert note_input == {
+            'title': 'Meeting Notes',
+            'content': 'Discussed project timeline',
+            'tags': ['work', 'meeting']
+        }
+        assert "#work #meeting" in mock_update.message.reply_text.call_args[0][0]
+    
+    @pytest.mark.asyncio
+    async def test_single_line_note(self, mock_update, mock_context, gql_client):
+        """Test a single line becomes both title and content"""
+        from handlers.message_handlers import create_note_from_message
+        
+        gql_client.execute.return_value = {'createNote': {'id': 'note-1', 'title': 'Buy milk', 'tags': []}}
+        mock_context.user_data['gql_client'] = gql_client
+        mock_update.message.text = "Buy milk #errands"
+        
+        await create_note_from_message(mock_update, mock_context)
+        
+        note_input = gql_client.execute.call_args[0][1]['input']
+        assert note_input['title'] == note_input['content'] == 'Buy milk'
+        assert note_input['tags'] == ['errands']
+
+
+class TestReminderMessage:
+    """Test creating reminders from text messages"""
+    
+    @pytest.mark.asyncio
+    async def test_due_and_priority_lines(self, mock_update, mock_context, gql_client):
+        """Test metadata lines are parsed and the rest becomes the description"""
+        from handlers.message_handlers import create_reminder_from_message
+        
+        gql_client.execute.return_value = {'createReminder': {'id': 'rem-1', 'title': 'Call mom'}}
+        mock_context.user_data.update({'gql_client': gql_client, 'timezone': 'Europe/Berlin'})
+        mock_update.message.text = "Call mom\nAsk about the trip\ndue: 2026-02-20 14:30\nPRIORITY: high"
+        
+        await create_reminder_from_message(mock_update, mock_context)
+        
+        reminder_input = gql_client.execute.call_args[0][1]['input']
+        assert reminder_input['title'] == 'Call mom'
+        assert reminder_input['description'] == 'Ask about the trip'
+        assert reminder_input['dueTime'] == '2026-02-20T14:30:00+01:00'
+        assert reminder_input['priority'] == 'HIGH'
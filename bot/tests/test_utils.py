@@ -28,6 +28,25 @@ class TestDateUtils:
         duration_hours = duration_minutes / 60
         assert duration_hours == 1.5
 
+    
+    def test_parse_iso_utc_suffix(self):
+        """Test API timestamps with a Z suffix parse as UTC"""
+        from datetime import timezone
+        from handlers.callbacks import _parse_iso
+        
+        dt = _parse_iso("2026-02-13T14:00:00Z")
+        assert dt == datetime(2026, 2, 13, 14, 0, tzinfo=timezone.utc)
+        assert _parse_iso("2026-02-13T14:00:00+00:00") == dt
+    
+    def test_fast_formatters_match_strftime(self):
+        """Test hand-rolled time/date formatting agrees with strftime"""
+        from handlers.callbacks import _fmt_12h, _fmt_date
+        
+        for hour in (0, 9, 12, 23):
+            dt = datetime(2026, 1, 5, hour, 7)
+            assert _fmt_12h(dt) == dt.strftime('%I:%M %p').lstrip('0')
+            assert _fmt_date(dt) == dt.strftime('%A, %B %d, %Y')
+
 
 class TestStringUtils:
     """Test string utility functions"""
@@ -50,3 +69,67 @@ class TestStringUtils:
         for text, expected_skill in patterns:
             # Just verify the expected skill is in the text
             assert expected_skill in text
+    
+    def test_clip_shortens_user_fields(self):
+        """Test long fields are shortened before formatting"""
+        from handlers.callbacks import _clip
+        
+        assert _clip("short") == "short"
+        assert _clip("x" * 500) == "x" * 100 + "…"
+    
+    def test_clip_html_never_splits_entities(self):
+        """Test escaped fields are cut before an entity, not inside it"""
+        from handlers.callbacks import _clip_html
+        
+        assert _clip_html("<R&D>") == "&lt;R&amp;D&gt;"
+        clipped = _clip_html("a" * 98 + "&&", limit=100)
+        assert clipped == "a" * 98 + "…"
+        assert _clip_html("&" * 30, limit=12) == "&amp;&amp;…"
+    
+    def test_normalize_dir(self):
+        """Test logical directories get one leading slash and no trailing slash"""
+        from handlers.file_handlers import _normalize_dir
+        
+        assert _normalize_dir('/') == '/'
+        assert _normalize_dir('') == '/'
+        assert _normalize_dir('//') == '/'
+        assert _normalize_dir('docs/work/') == '/docs/work'
+        assert _normalize_dir('/docs') == '/docs'
+    
+    def test_split_ext_matches_pathlib(self):
+        """Test filename splitting agrees with Path.stem/suffix"""
+        from pathlib import Path
+        from handlers.file_handlers import _split_ext
+        
+        for name in ('report.pdf', 'archive.tar.gz', 'README', '.env'):
+            assert _split_ext(name) == (Path(name).stem, Path(name).suffix)
+    
+    def test_claim_storage_path_never_reuses_existing(self, tmp_path):
+        """Test taken names fall back to the unique id, then to a counter"""
+        from handlers.file_handlers import _claim_storage_path
+        
+        (tmp_path / 'report.pdf').write_bytes(b'old')
+        (tmp_path / 'report_uid.pdf').write_bytes(b'older')
+        
+        first = _claim_storage_path(tmp_path, 'report.pdf', 'uid')
+        second = _claim_storage_path(tmp_path, 'report.pdf', 'uid')
+        
+        assert first.name == 'report_uid_1.pdf'
+        assert second.name == 'report_uid_2.pdf'
+        assert (tmp_path / 'report_uid.pdf').read_bytes() == b'older'
+    
+    def test_extract_tags_single_pass(self):
+        """Test tags are collected in order and removed from the text"""
+        from handlers.message_handlers import _extract_tags
+        
+        tags, text = _extract_tags("Meeting Notes\nDiscussed timeline\n#work #meeting")
+        assert tags == ['work', 'meeting']
+        assert text == "Meeting Notes\nDiscussed timeline\n "
+        assert _extract_tags("no tags here") == ([], "no tags here")
+    
+    def test_md_escape_legacy_markdown(self):
+        """Test entity markers in user text are backslash-escaped"""
+        from handlers.message_handlers import _md_escape
+        
+        assert _md_escape("my_notes *draft* [v2] `x`") == r"my\_notes \*draft\* \[v2] \`x\`"
+        assert _md_escape("plain title") == "plain title"